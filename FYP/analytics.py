@@ -0,0 +1,194 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from itertools import islice
+
+import config
+import storage
+
+# Rollups under this id cover every user (per-topic and per-day totals for the whole class)
+ALL_USERS = "*"
+
+_snapshot_lock = threading.Lock()
+_snapshot = {"key": None, "data": None}
+
+# ---------------------- ATTEMPTS ----------------------
+def _timestamp(value):
+    """Epoch seconds from an ISO-8601 string (Mongo export style), a {"$date": ...} wrapper or a number."""
+    if value is None:
+        return datetime.now(timezone.utc).timestamp()
+    if isinstance(value, dict):
+        value = value.get("$date")
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e11 else float(value)  # Mongo exports dates in milliseconds
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def normalise_attempt(record):
+    """One submitted quiz result in the field spelling of either the Mongo model or the old db.json export."""
+    user_id = record.get("user_id") or record.get("userId") or record.get("user id")
+    if not user_id:
+        raise ValueError("Attempt has no user id")
+    if user_id == ALL_USERS:
+        raise ValueError(f"{ALL_USERS!r} is reserved for the all-users rollups")
+    attempt = {
+        "user_id": str(user_id),
+        "topic": str(record.get("topic", "")).strip(),
+        "type": str(record.get("type") or record.get("quizType") or ""),
+        "difficulty": str(record.get("difficulty", "")),
+        "correct": int(record.get("correct_attempts", 0)),
+        "wrong": int(record.get("wrong_attempts", 0)),
+        "created_at": _timestamp(record.get("created_at")),
+    }
+
+    # Prefer the Mongo id; otherwise identify the attempt by its content so a backfill can be replayed
+    attempt_id = record.get("_id") or record.get("attempt_id")
+    if isinstance(attempt_id, dict):
+        attempt_id = attempt_id.get("$oid")
+    if not attempt_id:
+        attempt_id = hashlib.sha1(json.dumps(attempt, sort_keys=True).encode("utf-8")).hexdigest()
+    attempt["attempt_id"] = str(attempt_id)
+
+    day = datetime.fromtimestamp(attempt["created_at"], timezone.utc).strftime("%Y-%m-%d")
+    attempt["buckets"] = [
+        (user, dimension, bucket)
+        for user in (attempt["user_id"], ALL_USERS)
+        for dimension, bucket in (("total", ""), ("topic", attempt["topic"]), ("difficulty", attempt["difficulty"]),
+                                  ("type", attempt["type"]), ("day", day))
+    ]
+    return attempt
+
+def record_attempt(record):
+    """Store one quiz result and update its rollups. Returns False if it was already recorded."""
+    return storage.record_quiz_attempts([normalise_attempt(record)]) == 1
+
+def _backfill_batches(batches):
+    attempts = added = 0
+    for records in batches:
+        attempts += len(records)
+        added += storage.record_quiz_attempts(normalise_attempt(record) for record in records)
+    return {"attempts": attempts, "added": added}
+
+def backfill(path, batch_size=500):
+    """Import past attempts from a JSON array (e.g. db.json). Already recorded attempts are skipped."""
+    with open(path, "r") as f:
+        records = json.load(f)
+    return _backfill_batches(records[start:start + batch_size] for start in range(0, len(records), batch_size))
+
+def backfill_mongo(collection=None, batch_size=500, uri=None, database=None):
+    """Import the attempt history of a MongoDB collection (the Node app's Quiz documents by default).
+
+    Attempts keep their Mongo _id, so the ones submitQuiz already forwarded
+    are not counted twice. Run this before the dashboard reads rollups, or
+    users only see attempts made since forwarding started.
+    """
+    from pymongo import MongoClient
+    client = MongoClient(uri or config.MONGO_URI)
+    try:
+        db = client[database] if database else client.get_default_database(config.MONGO_DB)
+        cursor = db[collection or config.MONGO_QUIZ_COLLECTION].find({}, batch_size=batch_size)
+
+        def batches():
+            while True:
+                records = list(islice(cursor, batch_size))
+                if not records:
+                    return
+                yield records
+
+        return _backfill_batches(batches())
+    finally:
+        client.close()
+
+# ---------------------- DASHBOARD ----------------------
+def dashboard(user_id, include_all_users=False):
+    """Ready-to-chart dashboard data for one user, read straight from the rollups.
+
+    The chart objects have the same shape as the Node dashboard controller's,
+    so the frontend can use either. Returns None if the user has no attempts.
+    The all-users aggregate is only returned with include_all_users=True.
+    """
+    if user_id == ALL_USERS and not include_all_users:
+        raise ValueError(f"{ALL_USERS!r} is not a user id")
+    rollups = storage.get_quiz_rollups(user_id)
+    if not rollups:
+        return None
+    total = rollups["total"][0]
+    topics = rollups.get("topic", [])
+    difficulties = rollups.get("difficulty", [])
+    days = rollups.get("day", [])
+
+    return {
+        "totals": {
+            "quizzes": total["quizzes"],
+            "correct": total["correct"],
+            "wrong": total["wrong"],
+            "questions": total["correct"] + total["wrong"],
+        },
+        "byType": {row["bucket"]: {key: row[key] for key in ("quizzes", "correct", "wrong")}
+                   for row in rollups.get("type", [])},
+        "pieChartData": {
+            "labels": ["Correct", "Wrong"],
+            "datasets": [{"data": [total["correct"], total["wrong"]], "backgroundColor": ["green", "red"]}],
+        },
+        "barChartData": {
+            "labels": [row["bucket"] for row in topics],
+            "datasets": [
+                {"label": "Correct", "data": [row["correct"] for row in topics], "backgroundColor": "green"},
+                {"label": "Wrong", "data": [row["wrong"] for row in topics], "backgroundColor": "red"},
+            ],
+        },
+        "difficultyBarChartData": {
+            "labels": [row["bucket"] for row in difficulties],
+            "datasets": [{"label": "Questions", "data": [row["quizzes"] for row in difficulties],
+                          "backgroundColor": "skyblue"}],
+        },
+        "lineChartData": {
+            "labels": [row["bucket"] for row in days],
+            "datasets": [
+                {"label": "Correct", "data": [row["correct"] for row in days], "borderColor": "green", "fill": False},
+                {"label": "Wrong", "data": [row["wrong"] for row in days], "borderColor": "red", "fill": False},
+            ],
+        },
+    }
+
+# ---------------------- COHORT SNAPSHOT ----------------------
+def cohort_snapshot(path=None):
+    """The latest snapshot written by cohort_analytics.py, or None if the job has not run yet.
+
+    Kept in memory and re-read only when the file changes, so the API never
+    touches MongoDB or pandas.
+    """
+    path = path or config.COHORT_SNAPSHOT_PATH
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+    with _snapshot_lock:
+        if _snapshot["key"] != (path, mtime):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                _snapshot["data"] = json.load(f)
+            _snapshot["key"] = (path, mtime)
+        return _snapshot["data"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill quiz analytics rollups from a JSON export or MongoDB.")
+    parser.add_argument("path", nargs="?", default="db.json")
+    parser.add_argument("--mongo", action="store_true", help="import from MongoDB (MONGO_URI) instead of a JSON file")
+    parser.add_argument("--collection", help=f"MongoDB collection (default {config.MONGO_QUIZ_COLLECTION})")
+    parser.add_argument("--database", help="MongoDB database (default: the one in MONGO_URI, else MONGO_DB)")
+    parser.add_argument("--rebuild", action="store_true", help="clear all analytics before importing")
+    parser.add_argument("--user", help="print this user's dashboard data afterwards")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        storage.clear_quiz_analytics()
+    counts = backfill_mongo(args.collection, database=args.database) if args.mongo else backfill(args.path)
+    print(f"Recorded {counts['added']} new of {counts['attempts']} attempts into {config.STORAGE_DB_PATH}.")
+    if args.user:
+        print(json.dumps(dashboard(args.user), indent=2))
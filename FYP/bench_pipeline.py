@@ -0,0 +1,358 @@
+"""End-to-end benchmark of the notes / quiz / video pipelines.
+
+Runs reproducible scenarios against the offline model stand-ins
+(MODEL_BACKEND=fake) in a throwaway state directory, so results depend only
+on this machine and the code under test:
+
+  cold_small / cold_large   first request for a PDF: hash, extract, index, retrieve, generate
+  warm_small / warm_large   PDF already indexed: retrieve and generate only
+  cold_scanned              cold run on a scanned PDF (OCR); needs --scanned
+  concurrent                --users simultaneous notes + quiz requests through the worker pool
+  video                     map-reduce summary of a synthetic long transcript
+
+The small and large PDFs are the smallest and largest distinct PDFs in
+backend/uploads. Stage timings come from progress.set_stage, so "indexing"
+includes the extraction it streams from. Prints (and optionally writes) a
+JSON report with p50/p95/p99 per stage, throughput and peak RSS, and can
+compare it against a stored baseline:
+
+  python bench_pipeline.py --output run.json
+  python bench_pipeline.py --baseline run.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, the report has no peak RSS
+    resource = None
+
+SCENARIOS = ("cold_small", "warm_small", "cold_large", "warm_large", "cold_scanned", "concurrent", "video")
+
+TOPICS = ["introduction", "definitions", "main algorithm", "worked example", "complexity", "summary",
+          "applications", "history", "key terms", "common mistakes"]
+
+# ---------------------- ENVIRONMENT ----------------------
+def prepare_environment(state_dir, llm_latency):
+    """Point every store at state_dir and select the offline backends. Must run before config is imported."""
+    defaults = {
+        "MODEL_BACKEND": "fake",
+        "FAKE_LLM_LATENCY": str(llm_latency),
+        "CHROMA_PATH": os.path.join(state_dir, "chroma_db"),
+        "STORAGE_DB_PATH": os.path.join(state_dir, "studymate.db"),
+        "TEXT_CACHE_DIR": os.path.join(state_dir, "text_cache"),
+        "EMBEDDING_CACHE_DIR": os.path.join(state_dir, "embedding_cache"),
+        "LEXICAL_INDEX_DIR": os.path.join(state_dir, "lexical_index"),
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+    if "config" in sys.modules:
+        raise RuntimeError("prepare_environment() must run before config is imported")
+
+def reset_pdf_state(pdf_hash, state_dir):
+    """Forget everything derived from one PDF, so the next request for it is truly cold."""
+    import config
+    import embedding_cache
+    import fingerprint
+    import storage
+    import text_cache
+    import vector_store
+
+    conn = storage.get_connection()
+    with conn:
+        conn.execute("DELETE FROM embedding_vectors")
+        conn.execute("DELETE FROM generation_cache")
+    # A fresh vector file directory, so no vector of the previous run can be served from disk
+    config.EMBEDDING_CACHE_DIR = tempfile.mkdtemp(prefix="embeddings-", dir=state_dir)
+    embedding_cache.reset_embedding_cache()
+
+    vector_store.delete_book_collection(pdf_hash)
+    text_cache.delete_pages(pdf_hash)
+    fingerprint.clear_hash_cache()
+
+# ---------------------- MEASUREMENT ----------------------
+class StageTimer:
+    """progress.reporting() callback that accumulates wall time per stage."""
+
+    def __init__(self, first_stage="setup"):
+        self.durations = {}
+        self._stage = first_stage
+        self._started = time.perf_counter()
+
+    def __call__(self, stage):
+        now = time.perf_counter()
+        if stage != self._stage:
+            self.durations[self._stage] = self.durations.get(self._stage, 0.0) + now - self._started
+            self._stage = stage
+            self._started = now
+
+    def finish(self):
+        self(None)
+        return self.durations
+
+def timed(fn, *args, queued_at=None, **kwargs):
+    """Run fn with stage reporting. Returns (stage durations, total seconds, error or None)."""
+    import progress
+    timer = StageTimer()
+    if queued_at is not None:
+        timer.durations["queued"] = time.perf_counter() - queued_at
+    started = time.perf_counter()
+    error = None
+    try:
+        with progress.reporting(timer):
+            fn(*args, **kwargs)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    total = time.perf_counter() - started + timer.durations.get("queued", 0.0)
+    return timer.finish(), total, error
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = pct / 100 * (len(ordered) - 1)
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def summarise(values):
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4) if values else 0.0,
+    }
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its (OCR) children, in MB. ru_maxrss is KB on Linux.
+
+    None where getrusage is not available.
+    """
+    if resource is None:
+        return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+class ScenarioResult:
+    def __init__(self):
+        self.stages = {}
+        self.totals = []
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def add(self, sample):
+        stages, total, error = sample
+        with self._lock:
+            for stage, seconds in stages.items():
+                self.stages.setdefault(stage, []).append(seconds)
+            self.totals.append(total)
+            if error:
+                self.errors.append(error)
+
+    def report(self, wall_seconds):
+        return {
+            "jobs": len(self.totals),
+            "errors": len(self.errors),
+            "error_samples": sorted(set(self.errors))[:5],
+            "wall_seconds": round(wall_seconds, 3),
+            "throughput_per_second": round(len(self.totals) / wall_seconds, 3) if wall_seconds else 0.0,
+            "total": summarise(self.totals),
+            "stages": {stage: summarise(values) for stage, values in sorted(self.stages.items())},
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+# ---------------------- SCENARIOS ----------------------
+def run_cold(path, iterations, state_dir):
+    import note_gen
+    from fingerprint import file_hash
+    result = ScenarioResult()
+    for i in range(iterations):
+        reset_pdf_state(file_hash(path), state_dir)
+        result.add(timed(note_gen.generate_notes, path, TOPICS[i % len(TOPICS)], "slightly detailed", "bench",
+                         regenerate=True))
+    return result
+
+def run_warm(path, iterations):
+    import note_gen
+    import quiz_gen
+    # Make sure the PDF is indexed before timing starts
+    note_gen.prepare_notes(path, TOPICS[0], "slightly detailed", "bench")
+    result = ScenarioResult()
+    for i in range(iterations):
+        topic = TOPICS[i % len(TOPICS)]
+        result.add(timed(note_gen.generate_notes, path, topic, "slightly detailed", "bench", regenerate=True))
+        result.add(timed(quiz_gen.generate_quiz, path, topic, "mcq", "medium", "bench", regenerate=True))
+    return result
+
+def run_concurrent(path, users, pool):
+    import note_gen
+    note_gen.prepare_notes(path, TOPICS[0], "slightly detailed", "bench")
+    result = ScenarioResult()
+    futures = []
+    for user in range(users):
+        topic = f"{TOPICS[user % len(TOPICS)]} {user}"
+        queued_at = time.perf_counter()
+        futures.append(pool.submit_call(timed, pool.jobs["notes"], path, topic, "slightly detailed", f"user{user}",
+                                        regenerate=True, queued_at=queued_at))
+        futures.append(pool.submit_call(timed, pool.jobs["quiz"], path, topic, "true_false", "medium", f"user{user}",
+                                        regenerate=True, queued_at=queued_at))
+    for future in futures:
+        result.add(future.result())
+    return result
+
+def synthetic_transcript(seed, minutes=60):
+    """Timed entries of a made-up lecture, long enough to take the map-reduce path."""
+    import random
+    rng = random.Random(seed)
+    words = ("graph node edge weight path search tree balance rotation heap queue sort merge pivot "
+             "recursion memo table hash bucket collision").split()
+    entries = []
+    for second in range(0, minutes * 60, 5):
+        text = " ".join(rng.choice(words) for _ in range(14))
+        entries.append({"text": text, "start": float(second), "duration": 5.0})
+    return entries
+
+def run_video(iterations):
+    import yt_summerization
+    result = ScenarioResult()
+
+    def summarise_entries(entries):
+        import progress
+        progress.set_stage("generating")
+        yt_summerization.summarize_entries(entries, "medium")
+
+    for i in range(iterations):
+        result.add(timed(summarise_entries, synthetic_transcript(i)))
+    return result
+
+def pick_pdfs(folder):
+    """(smallest, largest) distinct PDFs in folder."""
+    from bench_retrieval import find_pdfs
+    paths = sorted(find_pdfs(folder).values(), key=os.path.getsize)
+    if not paths:
+        raise SystemExit(f"No PDFs found in {folder}")
+    return paths[0], paths[-1]
+
+def run_benchmark(args, state_dir):
+    import config
+    from worker_pool import GenerationPool
+
+    small, large = pick_pdfs(args.folder)
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "llm_backend": config.LLM_BACKEND,
+            "embedding_backend": config.EMBEDDING_BACKEND,
+            "fake_llm_latency": config.FAKE_LLM_LATENCY,
+            "fake_llm_tokens_per_second": config.FAKE_LLM_TOKENS_PER_SECOND,
+            "worker_pool_size": config.WORKER_POOL_SIZE,
+            "iterations": args.iterations,
+            "users": args.users,
+        },
+        "inputs": {"small": small, "large": large, "scanned": args.scanned},
+        "scenarios": {},
+    }
+    pool = GenerationPool()
+    runners = {
+        "cold_small": lambda: run_cold(small, args.iterations, state_dir),
+        "warm_small": lambda: run_warm(small, args.iterations),
+        "cold_large": lambda: run_cold(large, args.iterations, state_dir),
+        "warm_large": lambda: run_warm(large, args.iterations),
+        "cold_scanned": lambda: run_cold(args.scanned, args.iterations, state_dir),
+        "concurrent": lambda: run_concurrent(large, args.users, pool),
+        "video": lambda: run_video(args.iterations),
+    }
+    try:
+        for name in args.scenarios:
+            if name == "cold_scanned" and not args.scanned:
+                print("Skipping cold_scanned: pass --scanned PATH to a scanned PDF.", file=sys.stderr)
+                continue
+            print(f"Running {name}...", file=sys.stderr)
+            started = time.perf_counter()
+            result = runners[name]()
+            report["scenarios"][name] = result.report(time.perf_counter() - started)
+    finally:
+        pool.shutdown()
+    return report
+
+# ---------------------- BASELINE ----------------------
+def compare(report, baseline, tolerance):
+    """Ratios against a baseline report; a regression is a latency or throughput worse than tolerance allows."""
+    comparison = {"tolerance": tolerance, "scenarios": {}, "regressions": []}
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        ratios = {}
+        for metric in ("p50", "p95", "p99"):
+            old, new = previous["total"][metric], current["total"][metric]
+            if old:
+                ratios[f"total_{metric}"] = round(new / old, 3)
+                if new > old * (1 + tolerance):
+                    comparison["regressions"].append({"scenario": name, "metric": f"total.{metric}", "baseline": old, "current": new})
+        for stage, summary in current["stages"].items():
+            old = previous["stages"].get(stage, {}).get("p50")
+            if old:
+                ratios[f"{stage}_p50"] = round(summary["p50"] / old, 3)
+        old_throughput = previous["throughput_per_second"]
+        if old_throughput:
+            ratios["throughput"] = round(current["throughput_per_second"] / old_throughput, 3)
+            if current["throughput_per_second"] < old_throughput * (1 - tolerance):
+                comparison["regressions"].append({"scenario": name, "metric": "throughput_per_second",
+                                                  "baseline": old_throughput, "current": current["throughput_per_second"]})
+        comparison["scenarios"][name] = ratios
+    return comparison
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    default_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "uploads")
+    parser = argparse.ArgumentParser(description="Benchmark the notes / quiz / video pipelines offline.")
+    parser.add_argument("--folder", default=default_folder, help="folder of sample PDFs")
+    parser.add_argument("--scanned", help="a scanned PDF for the OCR scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=5, help="requests per sequential scenario")
+    parser.add_argument("--users", type=int, default=8, help="simultaneous users in the concurrent scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake model time to first token (seconds)")
+    parser.add_argument("--state-dir", help="keep indexes and caches here instead of a temporary directory")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against a previous JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before a regression is flagged")
+    args = parser.parse_args(argv)
+
+    state_dir = args.state_dir or tempfile.mkdtemp(prefix="studymate-bench-")
+    os.makedirs(state_dir, exist_ok=True)
+    prepare_environment(state_dir, args.llm_latency)
+    try:
+        report = run_benchmark(args, state_dir)
+    finally:
+        if not args.state_dir:
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+        status = 1 if report["comparison"]["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+    return status
+
+if __name__ == "__main__":
+    raise SystemExit(main())
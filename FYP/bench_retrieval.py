@@ -0,0 +1,121 @@
+"""Relevance / latency benchmark for the retrieval modes.
+
+Indexes every distinct PDF in a folder (backend/uploads by default), then
+builds known-answer queries from the chunks themselves: each query is the
+rarest terms of one sampled chunk, and that chunk is the relevant result.
+Reports hit rate and MRR at top_k, latency and how many queries needed a
+query embedding (and a Chroma query) per mode.
+
+With EMBEDDING_BACKEND=fake it runs offline, but the fake vectors carry no
+meaning, so only the lexical numbers (and the fast-path savings) are
+informative; use the Gemini backend to compare vector against hybrid.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import config
+from fingerprint import file_hash
+from text_cache import cached_pages
+from vector_store import get_book_collection, get_lexical_index, ensure_pdf_indexed, retrieve_chunks
+
+MODES = ("vector", "lexical", "hybrid")
+
+def find_pdfs(folder):
+    """Distinct PDFs in folder (uploads are often the same book under different names)."""
+    seen = {}
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            if f.read(5) != b"%PDF-":
+                continue
+        seen.setdefault(file_hash(path), path)
+    return seen
+
+def make_queries(index, count, terms_per_query, rng):
+    """[(query, relevant chunk ID), ...] built from the rarest terms of sampled chunks."""
+    df = {term: len(postings) // 2 for term, postings in index.postings.items()}
+    # Rebuild per-chunk term lists from the postings
+    chunk_terms = [[] for _ in index.ids]
+    for term, postings in index.postings.items():
+        for doc in postings[::2]:
+            chunk_terms[doc].append(term)
+
+    candidates = [doc for doc, terms in enumerate(chunk_terms) if len(terms) >= terms_per_query]
+    queries = []
+    for doc in rng.sample(candidates, min(count, len(candidates))):
+        rarest = sorted(chunk_terms[doc], key=lambda term: (df[term], term))[:terms_per_query]
+        queries.append((" ".join(rarest), index.ids[doc]))
+    return queries
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def run(folder, queries_per_pdf, top_k, terms_per_query, seed):
+    rng = random.Random(seed)
+    results = {mode: {"hits": 0, "reciprocal_ranks": 0.0, "latencies": [], "vector_queries": 0} for mode in MODES}
+    total_queries = 0
+
+    for pdf_hash, path in find_pdfs(folder).items():
+        db = get_book_collection(pdf_hash)
+        if ensure_pdf_indexed(db, pdf_hash, lambda: cached_pages(path, pdf_hash), source=path, user_id="benchmark"):
+            print(f"Indexed {path}.")
+        lexical = get_lexical_index(db, pdf_hash)
+        queries = make_queries(lexical, queries_per_pdf, terms_per_query, rng)
+        total_queries += len(queries)
+
+        # Counted rather than read from the embedding client, whose cache hides repeated topics
+        fast_path = sum(1 for query, _ in queries if config.LEXICAL_FAST_PATH and lexical.is_exact_match(query))
+        results["vector"]["vector_queries"] += len(queries)
+        results["hybrid"]["vector_queries"] += len(queries) - fast_path
+
+        for mode in MODES:
+            stats = results[mode]
+            for query, relevant in queries:
+                start = time.perf_counter()
+                chunks = retrieve_chunks(db, pdf_hash, query, top_k=top_k, token_budget=10 ** 9, mode=mode)
+                stats["latencies"].append(time.perf_counter() - start)
+                ids = [chunk["id"] for chunk in chunks]
+                if relevant in ids:
+                    stats["hits"] += 1
+                    stats["reciprocal_ranks"] += 1.0 / (ids.index(relevant) + 1)
+
+    report = {"queries": total_queries, "top_k": top_k, "embedding_backend": config.EMBEDDING_BACKEND}
+    for mode, stats in results.items():
+        latencies = stats["latencies"]
+        report[mode] = {
+            "hit_rate": round(stats["hits"] / total_queries, 4) if total_queries else 0.0,
+            "mrr": round(stats["reciprocal_ranks"] / total_queries, 4) if total_queries else 0.0,
+            "latency_avg_ms": round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "latency_p95_ms": round(1000 * percentile(latencies, 95), 2),
+            "vector_queries": stats["vector_queries"],
+        }
+    return report
+
+def main(argv=None):
+    default_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "uploads")
+    parser = argparse.ArgumentParser(description="Compare vector, lexical and hybrid retrieval on local PDFs.")
+    parser.add_argument("--folder", default=default_folder, help="folder of PDFs to index and query")
+    parser.add_argument("--queries", type=int, default=50, help="queries sampled per PDF")
+    parser.add_argument("--top-k", type=int, default=config.RETRIEVAL_TOP_K)
+    parser.add_argument("--terms", type=int, default=2, help="terms per generated query")
+    parser.add_argument("--seed", type=int, default=0)
+    # Generated queries always co-occur in their chunk, so the fast path answers every hybrid query;
+    # turn it off to measure rank fusion itself
+    parser.add_argument("--no-fast-path", action="store_true", help="always fuse with the vector ranking")
+    args = parser.parse_args(argv)
+
+    if args.no_fast_path:
+        config.LEXICAL_FAST_PATH = False
+    print(json.dumps(run(args.folder, args.queries, args.top_k, args.terms, args.seed), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,53 @@
+import config
+import metrics
+
+# ---------------------- TOKEN ESTIMATE ----------------------
+def estimate_tokens(text):
+    """Cheap local token estimate (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+# ---------------------- CHUNKING ----------------------
+def chunk_id(pdf_hash, page_no, offset):
+    """Stable chunk ID: the same book always produces the same IDs."""
+    return f"{pdf_hash}:{page_no}:{offset}"
+
+def chunk_pages(pages, pdf_hash, chunk_size=None, stride=None):
+    """Split (page_no, text) pairs into overlapping, page-tagged chunks.
+
+    Chunks never cross a page boundary, so every chunk can be traced back
+    to the page it came from. Yields dicts with id, text, page and offset.
+    """
+    chunk_size = chunk_size or config.CHUNK_SIZE
+    stride = stride or config.CHUNK_STRIDE
+    if stride <= 0 or stride > chunk_size:
+        raise ValueError("Chunk stride must be between 1 and the chunk size")
+
+    for page_no, text in pages:
+        # Chunk a whole page at a time, so the timer does not include the consumer's work between yields
+        with metrics.stage("chunk"):
+            page_chunks = []
+            offset = 0
+            while offset < len(text):
+                piece = text[offset:offset + chunk_size]
+                if piece.strip():
+                    page_chunks.append({
+                        "id": chunk_id(pdf_hash, page_no, offset),
+                        "text": piece,
+                        "page": page_no,
+                        "offset": offset,
+                    })
+                if offset + chunk_size >= len(text):
+                    break
+                offset += stride
+        yield from page_chunks
+
+def batched(items, batch_size):
+    """Group an iterable into lists of at most batch_size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,187 @@
+import argparse
+import gzip
+import json
+import os
+import time
+from itertools import islice
+
+import pandas as pd
+
+import config
+
+VALUES = ["quizzes", "correct", "wrong"]
+# Only the fields the job needs leave MongoDB ("user id" is the spelling of the old export)
+PROJECTION = {"_id": 0, "user_id": 1, "user id": 1, "topic": 1, "difficulty": 1,
+              "correct_attempts": 1, "wrong_attempts": 1, "created_at": 1}
+
+# ---------------------- LOADING ----------------------
+def mongo_batches(batch_size=None, uri=None, database=None, collection=None):
+    """Attempt documents from MongoDB in lists of batch_size, streamed from one projected cursor."""
+    from pymongo import MongoClient
+    batch_size = batch_size or config.COHORT_BATCH_SIZE
+    client = MongoClient(uri or config.MONGO_URI)
+    try:
+        attempts = client[database or config.MONGO_DB][collection or config.MONGO_ATTEMPTS_COLLECTION]
+        cursor = attempts.find({}, PROJECTION, batch_size=batch_size)
+        while True:
+            batch = list(islice(cursor, batch_size))
+            if not batch:
+                break
+            yield batch
+    finally:
+        client.close()
+
+def json_batches(path, batch_size=None):
+    """Attempt documents from a JSON array export (e.g. db.json), in lists of batch_size."""
+    batch_size = batch_size or config.COHORT_BATCH_SIZE
+    with open(path, "r") as f:
+        records = json.load(f)
+    for start in range(0, len(records), batch_size):
+        yield records[start:start + batch_size]
+
+def to_frame(docs):
+    """One batch of attempt documents as a typed frame: user_id, topic, difficulty, correct, wrong, created_at, day."""
+    raw = pd.DataFrame.from_records(docs)
+    user_ids = raw["user_id"] if "user_id" in raw else pd.Series(None, index=raw.index, dtype=object)
+    if "user id" in raw:
+        user_ids = user_ids.fillna(raw["user id"])
+
+    frame = pd.DataFrame({
+        "user_id": user_ids,
+        "topic": raw.get("topic", pd.Series("", index=raw.index)).fillna("").astype(str).str.strip(),
+        "difficulty": raw.get("difficulty", pd.Series("", index=raw.index)).fillna("").astype(str),
+        "correct": pd.to_numeric(raw.get("correct_attempts"), errors="coerce"),
+        "wrong": pd.to_numeric(raw.get("wrong_attempts"), errors="coerce"),
+        "created_at": pd.to_datetime(raw.get("created_at"), utc=True, errors="coerce", format="ISO8601"),
+    }).dropna(subset=["user_id", "created_at"])
+    frame["user_id"] = frame["user_id"].astype(str)
+    frame[["correct", "wrong"]] = frame[["correct", "wrong"]].fillna(0).astype("int64")
+    frame["quizzes"] = 1
+    frame["day"] = frame["created_at"].dt.floor("D")
+    return frame
+
+# ---------------------- AGGREGATION ----------------------
+def _partials(frame):
+    """Additive aggregates of one batch; summing these over batches gives the cohort totals."""
+    return {
+        "user_topic": frame.groupby(["user_id", "topic"])[VALUES].sum(),
+        "user_day": frame.groupby(["day", "user_id"])[VALUES].sum(),
+        "difficulty": frame.groupby("difficulty")[VALUES].sum(),
+        "last_active": frame.groupby("user_id")["created_at"].max(),
+    }
+
+def _combine(total, partial):
+    if total is None:
+        return partial
+    combined = {}
+    for name, part in partial.items():
+        both = pd.concat([total[name], part])
+        grouped = both.groupby(level=list(range(both.index.nlevels)))
+        combined[name] = grouped.max() if name == "last_active" else grouped.sum()
+    return combined
+
+def aggregate(batches):
+    """Fold batches of attempt documents into cohort aggregates, holding one batch in memory at a time."""
+    total = None
+    attempts = 0
+    for docs in batches:
+        frame = to_frame(docs)
+        attempts += len(frame)
+        if len(frame):
+            total = _combine(total, _partials(frame))
+    return total, attempts
+
+def _accuracy(frame):
+    answered = frame["correct"] + frame["wrong"]
+    return (frame["correct"] / answered.where(answered > 0)).fillna(0.0).round(4)
+
+def cohort_report(total, weak_accuracy=None, trend_days=None):
+    """Cohort summary and the students, topics, difficulties and daily tables from aggregate()."""
+    weak_accuracy = config.WEAK_TOPIC_ACCURACY if weak_accuracy is None else weak_accuracy
+    trend_days = trend_days or config.COHORT_TREND_DAYS
+    user_topic = total["user_topic"].assign(accuracy=_accuracy)
+
+    # Students, each with the topic they do worst on
+    students = user_topic[VALUES].groupby(level="user_id").sum()
+    students["accuracy"] = _accuracy(students)
+    students["topics"] = user_topic.groupby(level="user_id").size()
+    weakest = user_topic.reset_index().sort_values(["user_id", "accuracy", "quizzes"], ascending=[True, True, False])
+    students["weakest_topic"] = weakest.drop_duplicates("user_id").set_index("user_id")["topic"]
+    students["last_active"] = total["last_active"].dt.strftime("%Y-%m-%d")
+    students = students.sort_values(["accuracy", "quizzes"], ascending=[True, False]).reset_index()
+
+    # Topics ranked weakest first: lowest cohort accuracy, then most struggling students
+    topics = user_topic[VALUES].groupby(level="topic").sum()
+    topics["accuracy"] = _accuracy(topics)
+    topics["students"] = user_topic.groupby(level="topic").size()
+    topics["struggling_students"] = (user_topic["accuracy"] < weak_accuracy).groupby(level="topic").sum()
+    topics = topics.sort_values(["accuracy", "struggling_students"], ascending=[True, False]).reset_index()
+    topics.insert(0, "weakness_rank", range(1, len(topics) + 1))
+
+    difficulty = total["difficulty"].copy()
+    difficulty["accuracy"] = _accuracy(difficulty)
+    difficulty = difficulty.reset_index()
+
+    # Daily activity on a continuous calendar, with a rolling accuracy trend
+    user_day = total["user_day"]
+    daily = user_day.groupby(level="day").sum()
+    daily["active_students"] = user_day.groupby(level="day").size()
+    daily = daily.asfreq("D", fill_value=0)
+    daily["accuracy"] = _accuracy(daily)
+    rolling = daily[["correct", "wrong"]].rolling(trend_days, min_periods=1).sum()
+    daily["trend_accuracy"] = _accuracy(rolling)
+    daily.index = daily.index.strftime("%Y-%m-%d")
+    daily = daily.rename_axis("day").reset_index()
+
+    sums = students[VALUES].sum()
+    summary = {
+        "students": len(students),
+        "quizzes": int(sums["quizzes"]),
+        "correct": int(sums["correct"]),
+        "wrong": int(sums["wrong"]),
+        "accuracy": round(int(sums["correct"]) / max(int(sums["correct"] + sums["wrong"]), 1), 4),
+        "first_day": daily["day"].iloc[0],
+        "last_day": daily["day"].iloc[-1],
+        "struggling_students": int((students["accuracy"] < weak_accuracy).sum()),
+    }
+    return summary, {"students": students, "topics": topics, "difficulty": difficulty, "daily": daily}
+
+# ---------------------- SNAPSHOT ----------------------
+def write_snapshot(summary, tables, source, path=None):
+    """Write the report as gzipped columnar JSON ({column: [values]} per table), atomically."""
+    path = path or config.COHORT_SNAPSHOT_PATH
+    snapshot = {
+        "version": 1,
+        "generated_at": time.time(),
+        "source": source,
+        "summary": summary,
+        "tables": {name: table.to_dict(orient="list") for name, table in tables.items()},
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+def run(source=None, batch_size=None, path=None):
+    """Build the cohort snapshot from a JSON export, or from MongoDB when source is None."""
+    started = time.perf_counter()
+    batches = json_batches(source, batch_size) if source else mongo_batches(batch_size)
+    total, attempts = aggregate(batches)
+    if total is None:
+        raise LookupError("No quiz attempts found.")
+    summary, tables = cohort_report(total)
+    path = write_snapshot(summary, tables, source or f"mongodb:{config.MONGO_DB}.{config.MONGO_ATTEMPTS_COLLECTION}", path)
+    return {"attempts": attempts, "path": path, "seconds": round(time.perf_counter() - started, 3), "summary": summary}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute cohort-wide quiz analytics and write the snapshot the API serves.")
+    parser.add_argument("--json", help="read attempts from this JSON export (e.g. db.json) instead of MongoDB")
+    parser.add_argument("--batch-size", type=int, default=config.COHORT_BATCH_SIZE)
+    parser.add_argument("--output", default=config.COHORT_SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    result = run(args.json, args.batch_size, args.output)
+    print(f"Aggregated {result['attempts']} attempts in {result['seconds']}s -> {result['path']}")
+    print(json.dumps(result["summary"], indent=2))
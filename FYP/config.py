@@ -0,0 +1,129 @@
+import os
+
+# ---------------------- MODEL / API ----------------------
+# No default: the key must come from the environment (see require_google_api_key)
+GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY", "")
+GENERATION_MODEL = os.environ.get("GENERATION_MODEL", "gemini-2.0-flash")
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "models/text-embedding-004")
+
+# ---------------------- MODEL BACKENDS ----------------------
+# "gemini" or "fake" (deterministic and offline, for load tests); sets both backends unless overridden below
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "gemini")
+LLM_BACKEND = os.environ.get("LLM_BACKEND", MODEL_BACKEND)
+FAKE_SEED = int(os.environ.get("FAKE_SEED", "0"))
+FAKE_LLM_LATENCY = float(os.environ.get("FAKE_LLM_LATENCY", "0.5"))            # seconds to first token
+FAKE_LLM_TOKENS_PER_SECOND = float(os.environ.get("FAKE_LLM_TOKENS_PER_SECOND", "150"))
+FAKE_LLM_OUTPUT_TOKENS = int(os.environ.get("FAKE_LLM_OUTPUT_TOKENS", "400"))    # length of fake notes / summaries
+FAKE_LLM_FAILURE_RATE = float(os.environ.get("FAKE_LLM_FAILURE_RATE", "0"))
+FAKE_EMBED_LATENCY = float(os.environ.get("FAKE_EMBED_LATENCY", "0.05"))        # seconds per batch call
+FAKE_EMBED_FAILURE_RATE = float(os.environ.get("FAKE_EMBED_FAILURE_RATE", "0"))
+
+# ---------------------- STORAGE ----------------------
+CHROMA_PATH = os.environ.get("CHROMA_PATH", "./chroma_db")
+COLLECTION_NAME = os.environ.get("COLLECTION_NAME", "googlecard")
+# One Chroma collection per PDF hash instead of every book in COLLECTION_NAME
+COLLECTION_PER_BOOK = os.environ.get("COLLECTION_PER_BOOK", "1").lower() in ("1", "true", "yes")
+BOOK_COLLECTION_PREFIX = os.environ.get("BOOK_COLLECTION_PREFIX", "book_")
+OPEN_COLLECTIONS_MAX = int(os.environ.get("OPEN_COLLECTIONS_MAX", "64"))
+
+# ---------------------- METRICS ----------------------
+# Stage timings and counters for GET /metrics; when off, every hook returns immediately
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# ---------------------- WORKER POOL ----------------------
+WORKER_POOL_SIZE = int(os.environ.get("WORKER_POOL_SIZE", "4"))
+JOB_TIMEOUT = float(os.environ.get("JOB_TIMEOUT", "300"))
+
+# ---------------------- CHUNKING / RETRIEVAL ----------------------
+CHUNK_SIZE = int(os.environ.get("CHUNK_SIZE", "1500"))          # characters per chunk
+CHUNK_STRIDE = int(os.environ.get("CHUNK_STRIDE", "1200"))      # step between chunk starts (overlap = size - stride)
+INDEX_BATCH_SIZE = int(os.environ.get("INDEX_BATCH_SIZE", "1000"))    # chunks per Chroma add
+RETRIEVAL_TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", "5"))
+RETRIEVAL_TOKEN_BUDGET = int(os.environ.get("RETRIEVAL_TOKEN_BUDGET", "3000"))
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")   # "hybrid", "vector" or "lexical"
+RRF_K = int(os.environ.get("RRF_K", "60"))                     # reciprocal rank fusion constant
+LEXICAL_INDEX_DIR = os.environ.get("LEXICAL_INDEX_DIR", "./lexical_index")
+LEXICAL_INDEX_MEMORY_ITEMS = int(os.environ.get("LEXICAL_INDEX_MEMORY_ITEMS", "32"))   # BM25 indexes kept loaded
+# Short topics whose terms all appear together in one chunk are answered by BM25 alone, with no embedding call
+LEXICAL_FAST_PATH = os.environ.get("LEXICAL_FAST_PATH", "1").lower() in ("1", "true", "yes")
+LEXICAL_FAST_PATH_MAX_TERMS = int(os.environ.get("LEXICAL_FAST_PATH_MAX_TERMS", "3"))
+
+# ---------------------- PROMPT CONTEXT ----------------------
+# Estimated tokens of retrieved passage sent to Gemini, per detail level / quiz type
+NOTE_CONTEXT_BUDGETS = {"small overview": 1500, "slightly detailed": 3000, "very detailed": 6000}
+QUIZ_CONTEXT_BUDGETS = {"true_false": 2000, "fill_in_the_blanks": 2000, "mcq": 3000, "qa": 3000}
+CONTEXT_BUDGET_SCALE = float(os.environ.get("CONTEXT_BUDGET_SCALE", "1.0"))     # scales every budget above
+CONTEXT_DEDUPE_THRESHOLD = float(os.environ.get("CONTEXT_DEDUPE_THRESHOLD", "0.8"))   # shingle Jaccard
+CONTEXT_MIN_PIECE_TOKENS = int(os.environ.get("CONTEXT_MIN_PIECE_TOKENS", "100"))   # smallest truncated chunk worth sending
+
+# ---------------------- PDF EXTRACTION / OCR ----------------------
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(os.cpu_count() or 2)))
+OCR_MAX_IN_FLIGHT = int(os.environ.get("OCR_MAX_IN_FLIGHT", "8"))   # rendered pages alive at once
+OCR_DPI = int(os.environ.get("OCR_DPI", "200"))
+
+# ---------------------- EXTRACTED TEXT CACHE ----------------------
+TEXT_CACHE_DIR = os.environ.get("TEXT_CACHE_DIR", "./text_cache")
+TEXT_CACHE_MAX_BYTES = int(os.environ.get("TEXT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# ---------------------- FINGERPRINTING ----------------------
+# md5 keeps IDs compatible with everything already indexed; blake2b / xxh3_128 are faster options
+HASH_ALGORITHM = os.environ.get("HASH_ALGORITHM", "md5")
+HASH_CACHE_SIZE = int(os.environ.get("HASH_CACHE_SIZE", "1024"))
+
+# ---------------------- LOCAL DATABASE ----------------------
+STORAGE_DB_PATH = os.environ.get("STORAGE_DB_PATH", "./studymate.db")
+
+# ---------------------- COHORT ANALYTICS ----------------------
+# MongoDB sources of the cohort job (cohort_analytics.py) and the rollup backfill (analytics.py --mongo)
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB = os.environ.get("MONGO_DB", "quiz_dashboard")
+MONGO_ATTEMPTS_COLLECTION = os.environ.get("MONGO_ATTEMPTS_COLLECTION", "attempts")
+MONGO_QUIZ_COLLECTION = os.environ.get("MONGO_QUIZ_COLLECTION", "quizzes")     # the Node app's Quiz model
+COHORT_BATCH_SIZE = int(os.environ.get("COHORT_BATCH_SIZE", "5000"))     # attempts loaded per cursor batch
+COHORT_SNAPSHOT_PATH = os.environ.get("COHORT_SNAPSHOT_PATH", "./analytics_snapshots/cohort.v1.json.gz")
+WEAK_TOPIC_ACCURACY = float(os.environ.get("WEAK_TOPIC_ACCURACY", "0.6"))  # a student below this is struggling with a topic
+COHORT_TREND_DAYS = int(os.environ.get("COHORT_TREND_DAYS", "7"))           # rolling window for the accuracy trend
+
+# ---------------------- GENERATION CACHE ----------------------
+GENERATION_CACHE_TTL = float(os.environ.get("GENERATION_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+GENERATION_CACHE_MAX_ENTRIES = int(os.environ.get("GENERATION_CACHE_MAX_ENTRIES", "5000"))
+
+# ---------------------- QUIZ OUTPUT ----------------------
+# Ask Gemini for JSON (response_mime_type) instead of the "Q1. ... Answer: B" text format
+QUIZ_JSON_MODE = os.environ.get("QUIZ_JSON_MODE", "0").lower() in ("1", "true", "yes")
+QUIZ_BATCH_MAX_SPECS = int(os.environ.get("QUIZ_BATCH_MAX_SPECS", "12"))
+QUIZ_BATCH_MAX_PARALLEL = int(os.environ.get("QUIZ_BATCH_MAX_PARALLEL", "4"))   # concurrent Gemini calls, shared by all batches
+
+# ---------------------- EMBEDDING CLIENT ----------------------
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", MODEL_BACKEND)
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "100"))     # inputs per API call
+EMBED_MAX_CONCURRENCY = int(os.environ.get("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_REQUESTS_PER_MINUTE = float(os.environ.get("EMBED_REQUESTS_PER_MINUTE", "1500"))
+EMBED_MAX_RETRIES = int(os.environ.get("EMBED_MAX_RETRIES", "5"))
+EMBED_BACKOFF_BASE = float(os.environ.get("EMBED_BACKOFF_BASE", "0.5"))   # seconds
+EMBED_BACKOFF_MAX = float(os.environ.get("EMBED_BACKOFF_MAX", "30"))
+
+# ---------------------- EMBEDDING CACHE ----------------------
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "./embedding_cache")
+# Query vectors kept in memory as float32 (~3 KB each at 768 dimensions); document vectors stay on disk
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.environ.get("EMBEDDING_CACHE_MEMORY_ITEMS", "10000"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get("EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # vector files, per model
+
+# ---------------------- BACKGROUND JOBS ----------------------
+JOB_QUEUE_LIMIT = int(os.environ.get("JOB_QUEUE_LIMIT", "100"))        # queued + running jobs accepted at once
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "0.5"))   # seconds between SSE status checks
+
+# ---------------------- VIDEO SUMMARIES ----------------------
+SUMMARY_SINGLE_PASS_CHARS = int(os.environ.get("SUMMARY_SINGLE_PASS_CHARS", "60000"))  # longer transcripts use map-reduce
+TRANSCRIPT_SEGMENT_SECONDS = float(os.environ.get("TRANSCRIPT_SEGMENT_SECONDS", "600"))
+TRANSCRIPT_SEGMENT_MAX_CHARS = int(os.environ.get("TRANSCRIPT_SEGMENT_MAX_CHARS", "20000"))
+SUMMARY_MAX_PARALLEL = int(os.environ.get("SUMMARY_MAX_PARALLEL", "4"))
+
+# ---------------------- VALIDATION ----------------------
+def require_google_api_key():
+    """Fail fast when a Gemini backend is configured without GOOGLE_API_KEY; the fake backends need no key."""
+    if GOOGLE_API_KEY or "gemini" not in (LLM_BACKEND, EMBEDDING_BACKEND):
+        return
+    raise RuntimeError(
+        "GOOGLE_API_KEY is not set. Export it, or set MODEL_BACKEND=fake to run without Gemini."
+    )
@@ -0,0 +1,131 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import List
+
+import config
+import storage
+from chunking import estimate_tokens
+
+SHINGLE_WORDS = 5
+SENTENCE_END_RE = re.compile(r"[.!?](?=\s)")
+
+# ---------------------- BUDGETS ----------------------
+def context_budget(kind, variant):
+    """Token budget for the passage of one prompt, by detail level (notes) or quiz type (quiz)."""
+    budgets = config.NOTE_CONTEXT_BUDGETS if kind == "notes" else config.QUIZ_CONTEXT_BUDGETS
+    return int(budgets.get(variant, config.RETRIEVAL_TOKEN_BUDGET) * config.CONTEXT_BUDGET_SCALE)
+
+def candidate_top_k(budget):
+    """How many chunks to retrieve so that deduplication still leaves enough to fill the budget."""
+    chunk_tokens = estimate_tokens("x" * config.CHUNK_SIZE)
+    return max(config.RETRIEVAL_TOP_K, math.ceil(budget / chunk_tokens) + 2)
+
+# ---------------------- ASSEMBLY ----------------------
+@dataclass
+class Context:
+    __slots__ = ("text", "chunks", "budget", "candidate_chunks", "candidate_tokens", "context_tokens", "duplicates")
+    text: str
+    chunks: List[dict]      # chunks that made it into the passage, in reading order
+    budget: int
+    candidate_chunks: int
+    candidate_tokens: int
+    context_tokens: int
+    duplicates: int         # near-duplicate or fully overlapped chunks that were skipped
+
+def _shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def _trim_overlap(chunk, kept):
+    """Cut the characters a chunk shares with already-kept chunks of the same page.
+
+    Neighbouring chunks overlap by CHUNK_SIZE - CHUNK_STRIDE characters, so two
+    adjacent hits would otherwise send that text twice. Returns the page
+    offset of the remaining text and the text itself ("" if it is fully covered).
+    """
+    text = chunk["text"]
+    offset = chunk.get("offset")
+    if offset is None:
+        return None, text
+    start, end = offset, offset + len(text)
+    for other in kept:
+        if other["page"] != chunk["page"] or other.get("offset") is None:
+            continue
+        other_start, other_end = other["offset"], other["offset"] + len(other["text"])
+        if other_start <= start < other_end:
+            start = other_end
+        if other_start < end <= other_end:
+            end = other_start
+        if start >= end:
+            return start, ""
+    return start, text[start - offset:end - offset]
+
+def _truncate(text, tokens):
+    """Cut text to about `tokens` tokens, at the last sentence end if there is one."""
+    piece = text[:tokens * 4]
+    ends = [match.end() for match in SENTENCE_END_RE.finditer(piece)]
+    return piece[:ends[-1]] if ends and ends[-1] > len(piece) // 2 else piece
+
+def build_context(chunks, budget, dedupe_threshold=None):
+    """Pack ranked chunks (best first) into a passage of at most `budget` estimated tokens.
+
+    Overlapping neighbours are trimmed, near-duplicates (by word-shingle
+    Jaccard similarity) are skipped, and the last chunk that does not fit is
+    truncated at a sentence boundary. The chosen chunks are returned in page
+    order so the passage reads like the book.
+    """
+    dedupe_threshold = dedupe_threshold or config.CONTEXT_DEDUPE_THRESHOLD
+    kept = []
+    kept_shingles = []
+    used = 0
+    duplicates = 0
+    candidate_tokens = 0
+
+    for chunk in chunks:
+        candidate_tokens += estimate_tokens(chunk["text"])
+        if used >= budget:
+            continue
+        offset, text = _trim_overlap(chunk, kept)
+        if offset is not None:
+            # Kept chunks record the range they actually cover, so later overlap checks see the trimmed start
+            offset += len(text) - len(text.lstrip())
+        text = text.strip()
+        if not text:
+            duplicates += 1
+            continue
+        shingles = _shingles(text)
+        if any(len(shingles & other) / len(shingles | other) >= dedupe_threshold for other in kept_shingles):
+            duplicates += 1
+            continue
+
+        tokens = estimate_tokens(text)
+        if used + tokens > budget:
+            remaining = budget - used
+            if remaining < config.CONTEXT_MIN_PIECE_TOKENS:
+                continue
+            text = _truncate(text, remaining)
+            tokens = estimate_tokens(text)
+        kept.append({**chunk, "offset": offset, "text": text})
+        kept_shingles.append(shingles)
+        used += tokens
+
+    kept.sort(key=lambda chunk: (chunk.get("page") or 0, chunk.get("offset") or 0))
+    return Context(
+        text="\n\n".join(chunk["text"] for chunk in kept),
+        chunks=kept,
+        budget=budget,
+        candidate_chunks=len(chunks),
+        candidate_tokens=candidate_tokens,
+        context_tokens=used,
+        duplicates=duplicates,
+    )
+
+def record_usage(kind, pdf_hash, variant, context, prompt):
+    """Store the token counts of one assembled prompt (see storage.context_usage_summary)."""
+    storage.record_context_usage(
+        kind, pdf_hash, variant, context.budget, context.candidate_chunks, len(context.chunks),
+        context.duplicates, context.candidate_tokens, context.context_tokens, estimate_tokens(prompt),
+    )
@@ -0,0 +1,311 @@
+import hashlib
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, fine for a single dev server process
+    fcntl = None
+
+import config
+import metrics
+import storage
+
+# Only these vectors enter the memory tier; document vectors are written once at indexing and rarely reread
+MEMORY_TASK_TYPES = ("retrieval_query",)
+FILE_RE = re.compile(r"^(?P<slug>.+)\.(?P<dim>\d+)\.g(?P<generation>\d+)\.f32$")
+
+# ---------------------- VECTOR FILES ----------------------
+class VectorFile:
+    """Append-only float32 matrix on disk, read through a memory map.
+
+    One file per (model, dimension, generation); a vector's row number is
+    stored in the SQLite embedding_vectors table. Appends hold an exclusive
+    flock, so processes sharing the cache never hand out the same row.
+    """
+
+    def __init__(self, path, dim):
+        self.path = path
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self._lock = threading.Lock()
+        self._map = None
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def append(self, vectors):
+        """Write vectors and return the row number of the first one."""
+        data = array("f")
+        for vector in vectors:
+            if len(vector) != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {len(vector)}")
+            data.extend(vector)
+        with self._lock, open(self.path, "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                end = f.seek(0, os.SEEK_END)
+                if end % self.row_bytes:
+                    # A writer died mid-row; drop the partial row so row numbers stay aligned
+                    end -= end % self.row_bytes
+                    f.truncate(end)
+                f.write(data.tobytes())
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return end // self.row_bytes
+
+    def read(self, row):
+        """The vector at row as array('f'), or None if the file does not have it."""
+        with self._lock:
+            end = (row + 1) * self.row_bytes
+            if self._map is None or end > len(self._map):
+                # The file has grown since it was mapped; remap to see the new rows
+                self._close_map()
+                if self.size() >= self.row_bytes:
+                    try:
+                        with open(self.path, "rb") as f:
+                            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    except FileNotFoundError:  # evicted by another process
+                        return None
+            if self._map is None or end > len(self._map):
+                return None
+            vector = array("f")
+            vector.frombytes(self._map[row * self.row_bytes:end])
+            return vector
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def close(self):
+        with self._lock:
+            self._close_map()
+
+# ---------------------- CACHE ----------------------
+class EmbeddingCache:
+    """Two-tier cache of embeddings keyed on (text hash, task_type, model).
+
+    An in-memory LRU of recent query vectors (float32 arrays) sits in front
+    of the memory-mapped vector files, so hot query topics never touch the
+    disk or the network. On disk each (model, dim) is split into generations:
+    once the current file reaches half of max_bytes a new generation starts
+    and older ones are deleted, so the files stay within max_bytes. Vectors
+    read from the previous generation are copied forward, so anything still
+    in use survives the rotation.
+    """
+
+    def __init__(self, cache_dir=None, memory_items=None, max_bytes=None):
+        self.cache_dir = cache_dir or config.EMBEDDING_CACHE_DIR
+        self.memory_items = memory_items or config.EMBEDDING_CACHE_MEMORY_ITEMS
+        self.max_bytes = max_bytes or config.EMBEDDING_CACHE_MAX_BYTES
+        self._memory = OrderedDict()
+        self._files = {}
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text, task_type, model):
+        text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return f"{model}|{task_type}|{text_hash}"
+
+    @staticmethod
+    def _slug(model):
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+
+    def _vector_file(self, model, dim, generation):
+        with self._lock:
+            if (model, dim, generation) not in self._files:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                path = os.path.join(self.cache_dir, f"{self._slug(model)}.{dim}.g{generation}.f32")
+                self._files[(model, dim, generation)] = VectorFile(path, dim)
+            return self._files[(model, dim, generation)]
+
+    def _generations(self, model, dim):
+        """Generations of (model, dim) on disk, oldest first."""
+        slug = self._slug(model)
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            int(match["generation"]) for match in map(FILE_RE.match, names)
+            if match and match["slug"] == slug and int(match["dim"]) == dim
+        )
+
+    def _rotate(self, model, dim, generation):
+        """Start generation + 1 and delete everything older than generation."""
+        conn = storage.get_connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM embedding_vectors WHERE model = ? AND dim = ? AND generation < ?", (model, dim, generation)
+            )
+        for old in self._generations(model, dim):
+            if old < generation:
+                with self._lock:
+                    vector_file = self._files.pop((model, dim, old), None)
+                if vector_file is not None:
+                    vector_file.close()
+                try:
+                    os.remove(os.path.join(self.cache_dir, f"{self._slug(model)}.{dim}.g{old}.f32"))
+                except FileNotFoundError:
+                    pass
+        return generation + 1
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def _in_memory_tier(key):
+        return key.split("|")[-2] in MEMORY_TASK_TYPES
+
+    def get_many(self, keys):
+        """Return {key: array('f')} for every key found in memory or on disk."""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+
+        if missing:
+            conn = storage.get_connection()
+            rows = []
+            for i in range(0, len(missing), 500):  # stay under SQLite's bound-parameter limit
+                part = missing[i:i + 500]
+                placeholders = ",".join("?" * len(part))
+                rows.extend(conn.execute(
+                    f"SELECT cache_key, model, dim, generation, row FROM embedding_vectors "
+                    f"WHERE cache_key IN ({placeholders})", part
+                ).fetchall())
+
+            latest = {}
+            stale = {}  # (model, dim) -> [(key, vector)] read from an older generation
+            for row in rows:
+                model, dim = row["model"], row["dim"]
+                vector = self._vector_file(model, dim, row["generation"]).read(row["row"])
+                if vector is None:
+                    continue
+                found[row["cache_key"]] = vector
+                if self._in_memory_tier(row["cache_key"]):
+                    self._remember(row["cache_key"], vector)
+                if (model, dim) not in latest:
+                    latest[(model, dim)] = max(self._generations(model, dim), default=0)
+                if row["generation"] < latest[(model, dim)]:
+                    stale.setdefault((model, dim), []).append((row["cache_key"], vector))
+            for (model, _), items in stale.items():
+                self.put_many(model, items, remember=False)
+
+            disk_hits = sum(1 for key in missing if key in found)
+            with self._lock:
+                self.disk_hits += disk_hits
+                self.misses += len(missing) - disk_hits
+            metrics.CACHE_LOOKUPS.inc(disk_hits, cache="embedding", result="disk_hit")
+            metrics.CACHE_LOOKUPS.inc(len(missing) - disk_hits, cache="embedding", result="miss")
+        metrics.CACHE_LOOKUPS.inc(len(keys) - len(missing), cache="embedding", result="memory_hit")
+        return found
+
+    def put_many(self, model, items, remember=True):
+        """Store [(key, array('f')), ...] for one model."""
+        if not items:
+            return
+        dim = len(items[0][1])
+        generation = max(self._generations(model, dim), default=0)
+        vector_file = self._vector_file(model, dim, generation)
+        if vector_file.size() >= self.max_bytes // 2:
+            generation = self._rotate(model, dim, generation)
+            vector_file = self._vector_file(model, dim, generation)
+
+        first_row = vector_file.append([vector for _, vector in items])
+        conn = storage.get_connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_vectors (cache_key, model, dim, generation, row) VALUES (?, ?, ?, ?, ?)",
+                [(key, model, dim, generation, first_row + i) for i, (key, _) in enumerate(items)],
+            )
+        if remember:
+            for key, vector in items:
+                if self._in_memory_tier(key):
+                    self._remember(key, vector)
+
+    def embed(self, client, texts, task_type):
+        """Embed texts through the cache, sending only the misses to the client."""
+        texts = list(texts)
+        keys = [self.key(text, task_type, client.model) for text in texts]
+        found = self.get_many(keys)
+
+        todo = [(key, text) for key, text in zip(keys, texts) if key not in found]
+        # Identical texts in one call are embedded once
+        todo = list(OrderedDict(todo).items())
+        if todo:
+            vectors = client.embed([text for _, text in todo], task_type=task_type)
+            new_items = [(key, array("f", vector)) for (key, _), vector in zip(todo, vectors)]
+            self.put_many(client.model, new_items)
+            found.update(new_items)
+        # Chroma wants plain lists; only the cache holds the compact arrays
+        return [found[key].tolist() for key in keys]
+
+    def disk_bytes(self):
+        try:
+            return sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if FILE_RE.match(entry.name))
+        except FileNotFoundError:
+            return 0
+
+    def close(self):
+        """Unmap every vector file; the cache can still be used and reopens them on demand."""
+        with self._lock:
+            files = list(self._files.values())
+            self._files.clear()
+        for vector_file in files:
+            vector_file.close()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            stats = {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_items": len(self._memory),
+            }
+        stats["disk_bytes"] = self.disk_bytes()
+        return stats
+
+_lock = threading.Lock()
+_cache = None
+
+def get_embedding_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
+
+def reset_embedding_cache():
+    """Drop the process-wide cache (e.g. after EMBEDDING_CACHE_DIR changed); the next get builds a new one."""
+    global _cache
+    with _lock:
+        cache, _cache = _cache, None
+    if cache is not None:
+        cache.close()
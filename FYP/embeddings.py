@@ -0,0 +1,210 @@
+import hashlib
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import metrics
+
+# ---------------------- BACKENDS ----------------------
+class GeminiEmbeddingBackend:
+    """Calls genai.embed_content for one batch. Retries are handled by EmbeddingClient."""
+
+    def __init__(self, model=None):
+        self.model = model or config.EMBEDDING_MODEL
+
+    def embed(self, texts, task_type):
+        import google.generativeai as genai
+        import llm
+        llm.configure()
+        response = genai.embed_content(model=self.model, content=texts, task_type=task_type)
+        return response["embedding"]
+
+    def is_retryable(self, error):
+        from google.api_core import retry
+        return retry.if_transient_error(error)
+
+class FakeRateLimitError(Exception):
+    pass
+
+class FakeEmbeddingBackend:
+    """Deterministic offline embeddings: the same text always maps to the same unit vector.
+
+    latency is seconds per call; failure_rate injects FakeRateLimitError so the
+    retry and backoff paths can be exercised without a network.
+    """
+
+    def __init__(self, dimensions=768, latency=0.0, failure_rate=0.0, seed=0):
+        self.model = "fake-embedding"
+        self.dimensions = dimensions
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _vector(self, text, task_type):
+        values = []
+        counter = 0
+        while len(values) < self.dimensions:
+            digest = hashlib.sha256(f"{task_type}:{counter}:{text}".encode()).digest()
+            values.extend(b / 127.5 - 1.0 for b in digest)
+            counter += 1
+        values = values[:self.dimensions]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    def embed(self, texts, task_type):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        if failed:
+            raise FakeRateLimitError("429 fake rate limit")
+        # Queries and documents share a vector space, as with the real model
+        return [self._vector(text, "retrieval") for text in texts]
+
+    def is_retryable(self, error):
+        return isinstance(error, FakeRateLimitError)
+
+def make_backend(name=None):
+    name = name or config.EMBEDDING_BACKEND
+    if name == "gemini":
+        return GeminiEmbeddingBackend()
+    if name == "fake":
+        return FakeEmbeddingBackend(latency=config.FAKE_EMBED_LATENCY, failure_rate=config.FAKE_EMBED_FAILURE_RATE,
+                                    seed=config.FAKE_SEED)
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+# ---------------------- RATE LIMITING ----------------------
+class TokenBucket:
+    """Paces calls to `rate` per second, allowing bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available. Returns the time waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+# ---------------------- METRICS ----------------------
+class EmbeddingStats:
+    """Thread-safe throughput / latency counters for the embedding client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.inputs = 0
+            self.retries = 0
+            self.failures = 0
+            self.throttle_wait = 0.0
+            self.latency_total = 0.0
+            self.latency_max = 0.0
+
+    def record(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+            if "latency_total" in deltas:
+                self.latency_max = max(self.latency_max, deltas["latency_total"])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "inputs": self.inputs,
+                "retries": self.retries,
+                "failures": self.failures,
+                "throttle_wait_seconds": round(self.throttle_wait, 3),
+                "latency_avg_seconds": round(self.latency_total / self.requests, 4) if self.requests else 0.0,
+                "latency_max_seconds": round(self.latency_max, 4),
+                "inputs_per_second": round(self.inputs / self.latency_total, 1) if self.latency_total else 0.0,
+            }
+
+# ---------------------- CLIENT ----------------------
+class EmbeddingClient:
+    """Splits inputs into API-sized batches and embeds them concurrently with pacing and backoff."""
+
+    def __init__(self, backend=None, batch_size=None, max_concurrency=None, requests_per_minute=None,
+                 max_retries=None, backoff_base=None, backoff_max=None):
+        self.backend = backend or make_backend()
+        self.batch_size = batch_size or config.EMBED_BATCH_SIZE
+        self.max_concurrency = max_concurrency or config.EMBED_MAX_CONCURRENCY
+        self.max_retries = config.EMBED_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or config.EMBED_BACKOFF_BASE
+        self.backoff_max = backoff_max or config.EMBED_BACKOFF_MAX
+        rpm = requests_per_minute or config.EMBED_REQUESTS_PER_MINUTE
+        self.bucket = TokenBucket(rpm / 60.0, capacity=self.max_concurrency)
+        self.stats = EmbeddingStats()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed")
+
+    @property
+    def model(self):
+        return self.backend.model
+
+    def _embed_batch(self, texts, task_type):
+        attempt = 0
+        while True:
+            self.stats.record(throttle_wait=self.bucket.acquire())
+            started = time.perf_counter()
+            try:
+                with metrics.stage("embed"):
+                    vectors = self.backend.embed(texts, task_type)
+            except Exception as e:
+                if attempt >= self.max_retries or not self.backend.is_retryable(e):
+                    self.stats.record(failures=1)
+                    raise
+                attempt += 1
+                self.stats.record(retries=1)
+                # Full jitter: sleep a random time up to the capped exponential delay
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                continue
+            self.stats.record(requests=1, inputs=len(texts), latency_total=time.perf_counter() - started)
+            metrics.EMBEDDED_TEXTS.inc(len(texts))
+            return vectors
+
+    def embed(self, texts, task_type="retrieval_document"):
+        """Embed texts and return their vectors in input order."""
+        texts = list(texts)
+        if not texts:
+            return []
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self._embed_batch(batches[0], task_type)
+
+        futures = [self._executor.submit(self._embed_batch, batch, task_type) for batch in batches]
+        vectors = []
+        for future in futures:
+            vectors.extend(future.result())
+        return vectors
+
+_lock = threading.Lock()
+_client = None
+
+def get_embedding_client():
+    """Process-wide client, so pacing applies across every request in the worker pool."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = EmbeddingClient()
+        return _client
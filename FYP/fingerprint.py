@@ -0,0 +1,92 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import config
+import metrics
+
+READ_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+_lock = threading.Lock()
+_hash_cache = OrderedDict()  # (abs path, size, mtime_ns, algorithm) -> hex digest
+
+# ---------------------- HASHERS ----------------------
+def new_hasher(algorithm=None):
+    """Return a hashlib-style object for md5, sha1, blake2b or (if installed) xxhash."""
+    algorithm = algorithm or config.HASH_ALGORITHM
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=16)
+    if algorithm in ("xxh64", "xxh3_128"):
+        try:
+            import xxhash
+        except ImportError:
+            raise ValueError(f"Hash algorithm '{algorithm}' needs the xxhash package")
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+# ---------------------- PATH CACHE ----------------------
+def _cache_key(path, algorithm):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, algorithm)
+
+def _remember(key, digest):
+    with _lock:
+        _hash_cache[key] = digest
+        _hash_cache.move_to_end(key)
+        while len(_hash_cache) > config.HASH_CACHE_SIZE:
+            _hash_cache.popitem(last=False)
+
+# ---------------------- FILE HASHING ----------------------
+def file_hash(path, algorithm=None):
+    """Hash a file in fixed-size chunks, reusing the digest if (path, size, mtime) is unchanged."""
+    algorithm = algorithm or config.HASH_ALGORITHM
+    key = _cache_key(path, algorithm)
+    with _lock:
+        cached = _hash_cache.get(key)
+        if cached is not None:
+            _hash_cache.move_to_end(key)
+    metrics.cache_lookup("hash", cached is not None)
+    if cached is not None:
+        return cached
+
+    hasher = new_hasher(algorithm)
+    buffer = bytearray(READ_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with metrics.stage("hash"), open(path, "rb") as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            hasher.update(view[:n])
+    digest = hasher.hexdigest()
+    _remember(key, digest)
+    return digest
+
+def save_stream_with_hash(stream, dest_path, algorithm=None):
+    """Copy an upload stream to dest_path, hashing it on the way so the file is never re-read."""
+    algorithm = algorithm or config.HASH_ALGORITHM
+    hasher = new_hasher(algorithm)
+    # Only the hasher.update calls count as "hash"; reading the upload and writing it is "upload_save"
+    hashing = 0.0
+    started = time.perf_counter()
+    with open(dest_path, "wb") as out:
+        while True:
+            chunk = stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            hash_started = time.perf_counter()
+            hasher.update(chunk)
+            hashing += time.perf_counter() - hash_started
+            out.write(chunk)
+    digest = hasher.hexdigest()
+    metrics.STAGE_SECONDS.observe(hashing, stage="hash")
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - started - hashing, stage="upload_save")
+    _remember(_cache_key(dest_path, algorithm), digest)
+    return digest
+
+def clear_hash_cache():
+    """Forget every remembered digest, so the next file_hash re-reads the file."""
+    with _lock:
+        _hash_cache.clear()
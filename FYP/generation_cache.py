@@ -0,0 +1,65 @@
+import hashlib
+import json
+import re
+import time
+
+import config
+import metrics
+import storage
+
+# ---------------------- CACHE KEY ----------------------
+def normalise_topic(topic):
+    """Lowercase, collapse whitespace and trim punctuation so trivial variants share a cache entry."""
+    return re.sub(r"\s+", " ", topic).strip().strip(".,;:!?\"'").lower()
+
+def hash_parts(**parts):
+    """Stable SHA-256 over JSON-serialisable key parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+def make_key(kind, pdf_hash, chunk_ids, topic, options, prompt_version, model):
+    """Content-addressed key: the same book, passages, topic, options, prompt and model give the same key."""
+    return hash_parts(
+        kind=kind,
+        pdf_hash=pdf_hash,
+        chunks=sorted(chunk_ids),
+        topic=normalise_topic(topic),
+        options=options,
+        prompt_version=prompt_version,
+        model=model,
+    )
+
+# ---------------------- LOOKUP / STORE ----------------------
+def get(cache_key, ttl=None):
+    """Cached generation for this key, or None if missing or older than the TTL."""
+    ttl = config.GENERATION_CACHE_TTL if ttl is None else ttl
+    conn = storage.get_connection()
+    row = conn.execute("SELECT value, created_at FROM generation_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+    if row is None:
+        metrics.cache_lookup("generation", False)
+        return None
+
+    now = time.time()
+    with conn:
+        if now - row["created_at"] > ttl:
+            conn.execute("DELETE FROM generation_cache WHERE cache_key = ?", (cache_key,))
+            metrics.cache_lookup("generation", False)
+            return None
+        conn.execute("UPDATE generation_cache SET last_used = ? WHERE cache_key = ?", (now, cache_key))
+    metrics.cache_lookup("generation", True)
+    return row["value"]
+
+def put(cache_key, kind, value, max_entries=None):
+    """Store a generation and evict least recently used entries beyond max_entries."""
+    max_entries = max_entries or config.GENERATION_CACHE_MAX_ENTRIES
+    now = time.time()
+    conn = storage.get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO generation_cache (cache_key, kind, value, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (cache_key, kind, value, now, now),
+        )
+        conn.execute(
+            "DELETE FROM generation_cache WHERE cache_key IN ("
+            "SELECT cache_key FROM generation_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
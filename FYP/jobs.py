@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+import uuid
+
+import config
+import progress
+import storage
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class QueueFullError(Exception):
+    pass
+
+# ---------------------- JOB TABLE ----------------------
+def _update(job_id, **fields):
+    fields["updated_at"] = time.time()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = storage.get_connection()
+    with conn:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+def get_job(job_id):
+    """Job status as a JSON-ready dict, or None if the ID is unknown."""
+    row = storage.get_connection().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+def count_active():
+    row = storage.get_connection().execute(
+        "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+    ).fetchone()
+    return row[0]
+
+def recover_interrupted():
+    """Jobs left queued/running by a previous process will never finish; mark them failed."""
+    conn = storage.get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?)",
+            (FAILED, "Interrupted by server restart", time.time(), QUEUED, RUNNING),
+        )
+
+# ---------------------- JOB MANAGER ----------------------
+class JobManager:
+    """Runs generation jobs in the background on the GenerationPool and records them in SQLite."""
+
+    def __init__(self, pool, queue_limit=None):
+        self.pool = pool
+        self.queue_limit = queue_limit or config.JOB_QUEUE_LIMIT
+        self._lock = threading.Lock()
+        recover_interrupted()
+
+    def submit(self, kind, *args, on_done=None, **kwargs):
+        """Queue a job and return its ID immediately. on_done() runs after the job, success or not."""
+        with self._lock:
+            if count_active() >= self.queue_limit:
+                raise QueueFullError("Too many jobs in progress, try again shortly")
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            conn = storage.get_connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO jobs (job_id, kind, status, stage, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, QUEUED, QUEUED, now, now),
+                )
+        self.pool.submit_call(self._run, job_id, kind, args, kwargs, on_done)
+        return job_id
+
+    def _run(self, job_id, kind, args, kwargs, on_done):
+        _update(job_id, status=RUNNING, stage="starting")
+        last_stage = [None]
+
+        def report(stage):
+            if stage != last_stage[0]:  # indexing reports once per batch; only write changes
+                last_stage[0] = stage
+                _update(job_id, stage=stage)
+
+        try:
+            with progress.reporting(report):
+                result = self.pool.jobs[kind](*args, **kwargs)
+            if result is None:
+                _update(job_id, status=FAILED, stage=FAILED, error="No relevant content found")
+            else:
+                _update(job_id, status=DONE, stage=DONE, result=json.dumps(result))
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            _update(job_id, status=FAILED, stage=FAILED, error=str(e))
+        finally:
+            if on_done is not None:
+                on_done()
+
+    def events(self, job_id, poll_interval=None):
+        """Yield server-sent events whenever the job's status or stage changes, until it finishes."""
+        poll_interval = poll_interval or config.JOB_POLL_INTERVAL
+        last = None
+        while True:
+            job = get_job(job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'message': 'Unknown job'})}\n\n"
+                return
+            state = (job["status"], job["stage"])
+            if state != last:
+                yield f"data: {json.dumps(job)}\n\n"
+                last = state
+            if job["status"] in (DONE, FAILED):
+                return
+            time.sleep(poll_interval)
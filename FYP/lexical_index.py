@@ -0,0 +1,159 @@
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from operator import itemgetter
+
+import config
+
+# Bump when tokenisation changes so old index files are rebuilt
+LEXICAL_INDEX_VERSION = "1"
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:['+#-][a-z0-9]+)*")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in into is it its of on or that the their then there these
+this to was were which will with what when where who why how can not no do does so such than too very
+""".split())
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_lock = threading.Lock()
+_loaded = OrderedDict()  # pdf_hash -> LexicalIndex, most recently used last
+
+def tokenize(text):
+    # Possessives index under the bare word, so "Dijkstra" finds "Dijkstra's algorithm"
+    tokens = (token[:-2] if token.endswith("'s") else token for token in TOKEN_RE.findall(text.lower()))
+    return [token for token in tokens if token not in STOPWORDS]
+
+# ---------------------- INDEX ----------------------
+class LexicalIndex:
+    """BM25 inverted index over the chunks of one PDF.
+
+    Postings are flat array('I') of (chunk number, term frequency) pairs,
+    which keeps a few thousand chunks down to a few hundred KB in memory.
+    """
+
+    def __init__(self, pdf_hash):
+        self.pdf_hash = pdf_hash
+        self.ids = []
+        self.lengths = array("I")
+        self.postings = {}
+        self.total_length = 0
+
+    def add(self, chunk_id, text):
+        doc = len(self.ids)
+        tokens = tokenize(text)
+        self.ids.append(chunk_id)
+        self.lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        for term, tf in Counter(tokens).items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = array("I")
+            postings.append(doc)
+            postings.append(tf)
+
+    def search(self, query, top_k):
+        """Return [(chunk_id, score), ...] for the top_k BM25 matches, best first."""
+        n = len(self.ids)
+        if not n:
+            return []
+        avg_length = self.total_length / n or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings) // 2
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for i in range(0, len(postings), 2):
+                doc, tf = postings[i], postings[i + 1]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc] / avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        best = heapq.nlargest(top_k, scores.items(), key=itemgetter(1))
+        return [(self.ids[doc], score) for doc, score in best]
+
+    def is_exact_match(self, query, max_terms=None):
+        """True for short topics whose terms all occur together in at least one chunk ("AVL tree", "Dijkstra")."""
+        max_terms = max_terms or config.LEXICAL_FAST_PATH_MAX_TERMS
+        terms = set(tokenize(query))
+        if not terms or len(terms) > max_terms:
+            return False
+        docs = None
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                return False
+            term_docs = set(postings[::2])
+            docs = term_docs if docs is None else docs & term_docs
+            if not docs:
+                return False
+        return True
+
+    # Chunk IDs all start with "<pdf_hash>:", so only the page:offset suffix is stored
+    def to_json(self):
+        prefix = f"{self.pdf_hash}:"
+        return {
+            "version": LEXICAL_INDEX_VERSION,
+            "ids": [chunk_id[len(prefix):] if chunk_id.startswith(prefix) else chunk_id for chunk_id in self.ids],
+            "lengths": self.lengths.tolist(),
+            "postings": {term: postings.tolist() for term, postings in self.postings.items()},
+        }
+
+    @classmethod
+    def from_json(cls, pdf_hash, data):
+        index = cls(pdf_hash)
+        index.ids = [f"{pdf_hash}:{suffix}" for suffix in data["ids"]]
+        index.lengths = array("I", data["lengths"])
+        index.total_length = sum(index.lengths)
+        index.postings = {term: array("I", postings) for term, postings in data["postings"].items()}
+        return index
+
+# ---------------------- PERSISTENCE ----------------------
+def _index_path(pdf_hash, index_dir=None):
+    return os.path.join(index_dir or config.LEXICAL_INDEX_DIR, f"{pdf_hash}.v{LEXICAL_INDEX_VERSION}.bm25.json.gz")
+
+def _remember(index):
+    with _lock:
+        _loaded[index.pdf_hash] = index
+        _loaded.move_to_end(index.pdf_hash)
+        while len(_loaded) > config.LEXICAL_INDEX_MEMORY_ITEMS:
+            _loaded.popitem(last=False)
+
+def save_index(index, index_dir=None):
+    index_dir = index_dir or config.LEXICAL_INDEX_DIR
+    os.makedirs(index_dir, exist_ok=True)
+    path = _index_path(index.pdf_hash, index_dir)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump(index.to_json(), f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    _remember(index)
+
+def load_index(pdf_hash, index_dir=None):
+    """Return the PDF's LexicalIndex from memory or disk, or None if it has none."""
+    with _lock:
+        if pdf_hash in _loaded:
+            _loaded.move_to_end(pdf_hash)
+            return _loaded[pdf_hash]
+    try:
+        with gzip.open(_index_path(pdf_hash, index_dir), "rt", encoding="utf-8") as f:
+            index = LexicalIndex.from_json(pdf_hash, json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+    _remember(index)
+    return index
+
+def delete_index(pdf_hash, index_dir=None):
+    with _lock:
+        _loaded.pop(pdf_hash, None)
+    try:
+        os.remove(_index_path(pdf_hash, index_dir))
+    except FileNotFoundError:
+        pass
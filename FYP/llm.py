@@ -0,0 +1,197 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+import config
+import metrics
+from chunking import estimate_tokens
+
+_lock = threading.Lock()
+_configured = False
+_models = {}
+
+# ---------------------- GEMINI SETUP ----------------------
+def configure():
+    """Configure the Gemini SDK once per process."""
+    global _configured
+    config.require_google_api_key()
+    import google.generativeai as genai
+    with _lock:
+        if not _configured:
+            genai.configure(api_key=config.GOOGLE_API_KEY)
+            _configured = True
+
+def get_model(name=None, backend=None):
+    """Return a cached model for the configured backend (LLM_BACKEND).
+
+    Every backend exposes the GenerativeModel interface the generators use:
+    generate_content(prompt, stream=False, generation_config=None) returning
+    a response with .text, or an iterator of such chunks when streaming.
+    """
+    name = name or config.GENERATION_MODEL
+    backend = backend or config.LLM_BACKEND
+    if backend == "gemini":
+        configure()
+    with _lock:
+        if (backend, name) not in _models:
+            model = make_model(name, backend)
+            _models[(backend, name)] = InstrumentedModel(model) if config.METRICS_ENABLED else model
+        return _models[(backend, name)]
+
+def make_model(name, backend):
+    if backend == "gemini":
+        import google.generativeai as genai
+        return genai.GenerativeModel(name)
+    if backend == "fake":
+        return FakeGenerativeModel(name)
+    raise ValueError(f"Unknown LLM backend: {backend}")
+
+def model_id(name=None):
+    """Identifies the model in generation cache keys, so fake output never mixes with real output."""
+    name = name or config.GENERATION_MODEL
+    return name if config.LLM_BACKEND == "gemini" else f"{config.LLM_BACKEND}:{name}"
+
+# ---------------------- INSTRUMENTATION ----------------------
+class InstrumentedModel:
+    """Wraps a model to record call time, outcome and estimated tokens in and out (see metrics.py)."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        metrics.LLM_TOKENS.inc(estimate_tokens(prompt), direction="in")
+        started = time.perf_counter()
+        try:
+            response = self.model.generate_content(prompt, stream=stream, **kwargs)
+            if stream:
+                return self._stream(response, started)
+            metrics.LLM_TOKENS.inc(estimate_tokens(_text_of(response)), direction="out")
+        except Exception:
+            metrics.LLM_CALLS.inc(outcome="error")
+            raise
+        finally:
+            if not stream:
+                metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_call")
+        metrics.LLM_CALLS.inc(outcome="ok")
+        return response
+
+    def _stream(self, chunks, started):
+        outcome = "error"
+        try:
+            for chunk in chunks:
+                metrics.LLM_TOKENS.inc(estimate_tokens(_text_of(chunk)), direction="out")
+                yield chunk
+            outcome = "ok"
+        finally:
+            metrics.LLM_CALLS.inc(outcome=outcome)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_call")
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+def _text_of(response):
+    try:
+        return response.text or ""
+    except ValueError:  # Gemini raises when a response has no text part (e.g. blocked)
+        return ""
+
+# ---------------------- FAKE BACKEND ----------------------
+class FakeLLMError(Exception):
+    pass
+
+class FakeResponse:
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+class FakeGenerativeModel:
+    """Deterministic offline stand-in for a Gemini model, for load tests and benchmarks.
+
+    The same prompt always produces the same text, shaped like the real
+    output (quiz questions in the requested format, bullet-point notes and
+    summaries) so everything downstream of the model runs unchanged. latency
+    is the delay before the first token, tokens_per_second the output rate,
+    and failure_rate the chance that a call raises FakeLLMError.
+    """
+
+    def __init__(self, name, latency=None, tokens_per_second=None, output_tokens=None, failure_rate=None, seed=None):
+        self.model_name = name
+        self.latency = config.FAKE_LLM_LATENCY if latency is None else latency
+        self.tokens_per_second = tokens_per_second or config.FAKE_LLM_TOKENS_PER_SECOND
+        self.output_tokens = output_tokens or config.FAKE_LLM_OUTPUT_TOKENS
+        self.failure_rate = config.FAKE_LLM_FAILURE_RATE if failure_rate is None else failure_rate
+        self._random = random.Random(config.FAKE_SEED if seed is None else seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False, generation_config=None):
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        if failed:
+            time.sleep(self.latency)
+            raise FakeLLMError("503 fake model overloaded")
+
+        json_mode = (generation_config or {}).get("response_mime_type") == "application/json"
+        text = fake_text(prompt, self.output_tokens, json_mode)
+        if stream:
+            return self._stream(text)
+        time.sleep(self.latency + len(text) / 4 / self.tokens_per_second)
+        return FakeResponse(text)
+
+    def _stream(self, text):
+        time.sleep(self.latency)
+        piece_chars = 64  # ~16 tokens per streamed chunk
+        for start in range(0, len(text), piece_chars):
+            piece = text[start:start + piece_chars]
+            time.sleep(len(piece) / 4 / self.tokens_per_second)
+            yield FakeResponse(piece)
+
+def fake_text(prompt, output_tokens, json_mode=False):
+    """Plausible, deterministic model output for a prompt, built from the prompt's own words."""
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+    words = re.findall(r"[A-Za-z]{4,}", prompt) or ["topic", "concept", "example", "definition"]
+
+    def sentence(length=12):
+        return " ".join(rng.choice(words) for _ in range(length)).capitalize()
+
+    # The quiz type is read from the task line only ("Generate 5 easy level true or false questions on ..."):
+    # the passage and the JSON-mode instruction can mention other types
+    task = re.search(r"generate (\d+)\b(.*?)\bquestions\b", prompt.lower())
+    count = int(task.group(1)) if task else 5
+    quiz_type = next(
+        (kind for marker, kind in (("multiple-choice", "mcq"), ("fill-in-the-blank", "fill_in_the_blanks"),
+                                   ("true or false", "true_false"), ("short answer", "qa"))
+         if task and marker in task.group(2)),
+        None,
+    )
+    if quiz_type is None:
+        lines = []
+        while sum(len(line) for line in lines) < output_tokens * 4:
+            lines.append(f"- {sentence(rng.randint(8, 20))}.")
+        return "## Key points\n\n" + "\n".join(lines)
+
+    questions = []
+    for _ in range(count):
+        if quiz_type == "mcq":
+            options = [sentence(3) for _ in range(4)]
+            questions.append({"question": f"{sentence()}?", "options": options, "answer": rng.choice("ABCD")})
+        elif quiz_type == "fill_in_the_blanks":
+            answer = rng.choice(words).lower()
+            questions.append({"question": f"{sentence(6)} ____ {sentence(5).lower()}.", "options": [], "answer": answer})
+        elif quiz_type == "true_false":
+            questions.append({"question": f"{sentence()}.", "options": [], "answer": rng.choice(["True", "False"])})
+        else:
+            questions.append({"question": f"{sentence(8)}?", "options": [], "answer": f"{sentence(10)}."})
+
+    if json_mode:
+        return json.dumps(questions)
+    blocks = []
+    for number, item in enumerate(questions, start=1):
+        lines = [f"Q{number}. {item['question']}"]
+        lines.extend(f"{letter}) {option}" for letter, option in zip("ABCD", item["options"]))
+        lines.append(f"Answer: {item['answer']}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
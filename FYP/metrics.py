@@ -0,0 +1,155 @@
+import bisect
+import threading
+import time
+
+import config
+
+_lock = threading.Lock()
+_registry = {}  # name -> metric, in registration order
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# ---------------------- METRIC TYPES ----------------------
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}  # label values -> total
+
+    def inc(self, amount=1, **labels):
+        if not config.METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with _lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.label_names, key)), value
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [per-bucket counts (last is +Inf), sum]
+
+    def observe(self, value, **labels):
+        if not config.METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def samples(self):
+        with _lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": "+Inf" if bound == float("inf") else repr(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+def _register(metric):
+    with _lock:
+        return _registry.setdefault(metric.name, metric)
+
+def counter(name, help_text, label_names=()):
+    return _register(Counter(name, help_text, label_names))
+
+def histogram(name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, help_text, label_names, buckets))
+
+# ---------------------- PIPELINE METRICS ----------------------
+STAGE_SECONDS = histogram(
+    "studymate_stage_seconds",
+    "Time spent in each pipeline stage (upload_save, hash, extract, ocr, chunk, embed, chroma_add, chroma_query, "
+    "prompt_assembly, llm_call, history_write).",
+    ("stage",),
+)
+CACHE_LOOKUPS = counter("studymate_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+OCR_PAGES = counter("studymate_ocr_pages_total", "Pages with no text layer sent to OCR.")
+EMBEDDED_TEXTS = counter("studymate_embedded_texts_total", "Texts sent to the embedding backend.")
+LLM_CALLS = counter("studymate_llm_calls_total", "LLM calls by outcome.", ("outcome",))
+LLM_TOKENS = counter("studymate_llm_tokens_total", "Estimated LLM tokens by direction (in = prompt, out = output).",
+                     ("direction",))
+SINGLEFLIGHT_CALLS = counter(
+    "studymate_singleflight_calls_total",
+    "Calls into each single-flight group; role is leader (ran the work) or waiter (shared a leader's result).",
+    ("flight", "role"),
+)
+SINGLEFLIGHT_FAN_OUT = histogram(
+    "studymate_singleflight_fan_out", "Callers served by each single-flight execution.", ("flight",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+HTTP_SECONDS = histogram("studymate_http_request_seconds", "Flask request latency.", ("endpoint", "status"))
+
+# ---------------------- TIMING ----------------------
+class _StageTimer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, stage=self.stage)
+        return False
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NOOP_TIMER = _NoopTimer()
+
+def stage(name):
+    """Context manager timing one pipeline stage; a shared no-op when METRICS_ENABLED is off."""
+    return _StageTimer(name) if config.METRICS_ENABLED else _NOOP_TIMER
+
+def cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+# ---------------------- EXPOSITION ----------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def render():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
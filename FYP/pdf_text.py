@@ -0,0 +1,123 @@
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PyPDF2 import PdfReader
+
+import config
+import metrics
+
+# Bump whenever extraction output changes, so cached text from older extractors is ignored
+EXTRACTOR_VERSION = "2"
+
+_lock = threading.Lock()
+_ocr_executor = None
+
+# ---------------------- OCR WORKERS ----------------------
+def _ocr_mp_context():
+    """Start method for OCR workers: never fork the web process itself.
+
+    By the time OCR starts, the process holds worker-pool threads, SQLite
+    connections and Chroma client threads, whose locks a forked child could
+    inherit while held. A forkserver starts clean once (with this module
+    preloaded) and forks the workers; Windows has no forkserver and uses spawn.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+def get_ocr_executor():
+    """Process pool shared by every extraction in this process, created on first scanned page."""
+    global _ocr_executor
+    with _lock:
+        if _ocr_executor is None:
+            _ocr_executor = ProcessPoolExecutor(max_workers=config.OCR_WORKERS, mp_context=_ocr_mp_context())
+        return _ocr_executor
+
+def ocr_page(pdf_path, page_no, dpi=None):
+    """Render a single page and OCR it. Runs inside an OCR worker process."""
+    images = convert_from_path(pdf_path, dpi=dpi or config.OCR_DPI, first_page=page_no, last_page=page_no)
+    return ''.join(pytesseract.image_to_string(image) for image in images)
+
+# ---------------------- TEXT EXTRACTION ----------------------
+def _open_reader(pdf_path):
+    try:
+        reader = PdfReader(pdf_path)
+        return reader, len(reader.pages)
+    except Exception as e:
+        print(f"PyPDF2 failed: {e}")
+        return None, pdfinfo_from_path(pdf_path)["Pages"]
+
+def _text_layer(reader, page_no):
+    if reader is None:
+        return ''
+    try:
+        with metrics.stage("extract"):
+            return reader.pages[page_no - 1].extract_text() or ''
+    except Exception as e:
+        print(f"PyPDF2 failed on page {page_no}: {e}")
+        return ''
+
+def _time_ocr(future):
+    """Record an OCR page; its time runs from submission to completion, so it includes waiting for a worker."""
+    metrics.OCR_PAGES.inc()
+    if config.METRICS_ENABLED:
+        submitted = time.perf_counter()
+        future.add_done_callback(lambda _: metrics.STAGE_SECONDS.observe(time.perf_counter() - submitted, stage="ocr"))
+
+def iter_pages_from_pdf(pdf_path, max_in_flight=None):
+    """Yield (page_no, text) in page order as pages become available.
+
+    Pages with a text layer come straight from PyPDF2. Pages whose text
+    layer is empty are rendered one at a time (first_page/last_page) and
+    OCR'd on the process pool. At most max_in_flight pages are rendered or
+    waiting to be yielded at once, which bounds memory on scanned books.
+    """
+    max_in_flight = max_in_flight or config.OCR_MAX_IN_FLIGHT
+    reader, page_count = _open_reader(pdf_path)
+    pending = deque()  # (page_no, text or Future), in page order
+    in_flight = 0
+    ocr_pages = 0
+
+    try:
+        for page_no in range(1, page_count + 1):
+            text = _text_layer(reader, page_no)
+            if text.strip():
+                pending.append((page_no, text))
+            else:
+                future = get_ocr_executor().submit(ocr_page, pdf_path, page_no)
+                _time_ocr(future)
+                pending.append((page_no, future))
+                in_flight += 1
+                ocr_pages += 1
+
+            # Yield everything that is ready; block on the oldest OCR job once the window is full
+            while pending and (isinstance(pending[0][1], str) or in_flight >= max_in_flight):
+                head_no, head = pending.popleft()
+                if not isinstance(head, str):
+                    head = head.result()
+                    in_flight -= 1
+                yield head_no, head
+
+        while pending:
+            head_no, head = pending.popleft()
+            yield head_no, head if isinstance(head, str) else head.result()
+    finally:
+        for _, item in pending:
+            if not isinstance(item, str):
+                item.cancel()
+
+    print(f"Extracted {page_count} pages ({ocr_pages} via OCR).")
+
+def extract_pages_from_pdf(pdf_path):
+    """Return a list of (page_no, text) tuples, page numbers starting at 1."""
+    return list(iter_pages_from_pdf(pdf_path))
+
+def extract_text_from_pdf(pdf_path):
+    return ''.join(text for _, text in iter_pages_from_pdf(pdf_path))
@@ -0,0 +1,25 @@
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+# ---------------------- STAGE REPORTING ----------------------
+def set_stage(stage):
+    """Report the current pipeline stage (extracting, indexing, retrieving, generating, ...).
+
+    A no-op unless the calling thread is running inside reporting(), so the
+    generators can call it unconditionally from the CLI as well.
+    """
+    callback = getattr(_local, "callback", None)
+    if callback is not None:
+        callback(stage)
+
+@contextmanager
+def reporting(callback):
+    """Send every set_stage() made on this thread to callback while the block runs."""
+    previous = getattr(_local, "callback", None)
+    _local.callback = callback
+    try:
+        yield
+    finally:
+        _local.callback = previous
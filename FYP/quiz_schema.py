@@ -0,0 +1,178 @@
+import json
+import re
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+OPTION_LETTERS = "ABCDEFGH"
+
+# ---------------------- TYPES ----------------------
+@dataclass
+class QuizItem:
+    __slots__ = ("number", "question", "options", "answer", "answer_index", "source_chunk")
+    number: int
+    question: str
+    options: List[str]
+    answer: str
+    answer_index: Optional[int]   # index into options for mcq / true_false
+    source_chunk: Optional[str]   # ID of the retrieved chunk the question most likely came from
+
+@dataclass
+class ParsedQuiz:
+    __slots__ = ("quiz_type", "items", "dropped", "repaired")
+    quiz_type: str
+    items: List[QuizItem]
+    dropped: int    # malformed items that could not be repaired
+    repaired: int   # items fixed up during validation
+
+    def to_dict(self):
+        return {
+            "quizType": self.quiz_type,
+            "questions": [asdict(item) for item in self.items],
+            "dropped": self.dropped,
+            "repaired": self.repaired,
+        }
+
+# ---------------------- PARSING ----------------------
+QUESTION_RE = re.compile(r"^\W*Q(?:uestion)?\s*(\d+)\s*[.):\-]*\**\s*(.*)$", re.IGNORECASE)
+OPTION_RE = re.compile(r"^\W*\(?([A-Ha-h])\s*[).:]\**\s+(.+)$")
+ANSWER_RE = re.compile(r"^\W*(?:correct\s+)?answer\s*\**\s*[:\-]\s*\**\s*(.+?)\s*\**$", re.IGNORECASE)
+# "B", "B)", "(B)", "B. Option text"; a letter starting a word ("A linked list") is option text, not a letter
+ANSWER_LETTER_RE = re.compile(r"^\(?([A-Ha-h])(?:\s*[).:]|\s*$)")
+
+def _strip_markdown(text):
+    return text.strip().strip("*").strip()
+
+def _parse_json(text):
+    """Items from a JSON-mode response (optionally inside a ``` fence), or None if it is not JSON."""
+    body = text.strip()
+    if body.startswith("```"):
+        body = body.strip("`")
+        body = body[body.find("\n") + 1:] if "\n" in body else body
+    if not body.startswith(("[", "{")):
+        return None
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    if isinstance(data, dict):
+        data = data.get("questions", [])
+    return [
+        {"question": str(item.get("question", "")), "options": [str(o) for o in item.get("options") or []],
+         "answer": str(item.get("answer", ""))}
+        for item in data if isinstance(item, dict)
+    ]
+
+def _parse_text(text):
+    """Single pass over the 'Q1. ... A) ... Answer: B' format."""
+    items = []
+    current = None
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        match = QUESTION_RE.match(line)
+        if match:
+            current = {"question": _strip_markdown(match.group(2)), "options": [], "answer": ""}
+            items.append(current)
+            continue
+        if current is None:
+            continue  # preamble such as "Okay, here are 5 questions..."
+
+        match = ANSWER_RE.match(line)
+        if match:
+            current["answer"] = _strip_markdown(match.group(1))
+            continue
+        match = OPTION_RE.match(line)
+        if match and not current["answer"]:
+            current["options"].append(_strip_markdown(match.group(2)))
+            continue
+        if not current["options"] and not current["answer"]:
+            current["question"] = f"{current['question']} {_strip_markdown(line)}".strip()
+    return items
+
+# ---------------------- VALIDATION / REPAIR ----------------------
+def _repair(raw, quiz_type):
+    """Return (question, options, answer, answer_index, repaired) or None if the item is unusable."""
+    question = raw["question"].strip()
+    options = [option for option in raw["options"] if option]
+    answer = raw["answer"].strip()
+    repaired = False
+    if not question or not answer:
+        return None
+
+    if quiz_type == "mcq":
+        if len(options) < 2:
+            return None
+        letter = ANSWER_LETTER_RE.match(answer)
+        if letter and OPTION_LETTERS.index(letter.group(1).upper()) < len(options):
+            index = OPTION_LETTERS.index(letter.group(1).upper())
+            repaired = answer.upper() != letter.group(1).upper()
+        else:
+            # The model sometimes answers with the option text instead of its letter
+            lowered = [option.lower() for option in options]
+            if answer.lower() not in lowered:
+                return None
+            index = lowered.index(answer.lower())
+            repaired = True
+        return question, options, OPTION_LETTERS[index], index, repaired
+
+    if quiz_type == "true_false":
+        value = answer.lower().rstrip(".")
+        if value in ("true", "t", "yes"):
+            normalised = "True"
+        elif value in ("false", "f", "no"):
+            normalised = "False"
+        else:
+            return None
+        repaired = normalised != answer or options not in ([], ["True", "False"])
+        return question, ["True", "False"], normalised, 0 if normalised == "True" else 1, repaired
+
+    if quiz_type == "fill_in_the_blanks" and "__" not in question:
+        # Blank out the answer inside the sentence when the model forgot the blank
+        pattern = re.compile(re.escape(answer), re.IGNORECASE)
+        if not pattern.search(question):
+            return None
+        question = pattern.sub("____", question, count=1)
+        repaired = True
+
+    return question, [], answer, None, repaired
+
+def _source_chunk(question, answer, chunks):
+    """Pick the retrieved chunk sharing the most words with the question and answer."""
+    if not chunks:
+        return None
+    words = set(re.findall(r"\w{4,}", f"{question} {answer}".lower()))
+    best = max(chunks, key=lambda chunk: len(words & set(re.findall(r"\w{4,}", chunk["text"].lower()))))
+    return best["id"]
+
+def parse_quiz(text, quiz_type, chunks=None):
+    """Turn model output (plain-text format or JSON) into a validated ParsedQuiz."""
+    raw_items = _parse_json(text)
+    if raw_items is None:
+        raw_items = _parse_text(text)
+
+    items = []
+    dropped = 0
+    repaired = 0
+    for raw in raw_items:
+        fixed = _repair(raw, quiz_type)
+        if fixed is None:
+            dropped += 1
+            continue
+        question, options, answer, answer_index, was_repaired = fixed
+        repaired += was_repaired
+        items.append(QuizItem(len(items) + 1, question, options, answer, answer_index,
+                              _source_chunk(question, answer, chunks)))
+    return ParsedQuiz(quiz_type, items, dropped, repaired)
+
+def format_quiz_text(parsed):
+    """Render a ParsedQuiz back into the 'Q1. ... Answer: B' text format the frontend parses."""
+    blocks = []
+    for item in parsed.items:
+        lines = [f"Q{item.number}. {item.question}"]
+        if parsed.quiz_type == "mcq":
+            lines.extend(f"{OPTION_LETTERS[i]}) {option}" for i, option in enumerate(item.options))
+        lines.append(f"Answer: {item.answer}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
@@ -0,0 +1,75 @@
+import threading
+from concurrent.futures import Future
+
+import metrics
+
+_registry_lock = threading.Lock()
+_registry = {}
+
+# ---------------------- SINGLE FLIGHT ----------------------
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key runs fn; callers arriving while it is still
+    running wait for that result (or exception) instead of repeating the work.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> [future, number of callers]
+        self.calls = 0
+        self.executions = 0
+        self.waits = 0
+        self.max_fan_out = 0
+        if name:
+            with _registry_lock:
+                _registry[name] = self
+
+    def do(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = [Future(), 1]
+                self._in_flight[key] = flight
+                self.executions += 1
+            else:
+                flight[1] += 1
+                self.waits += 1
+        if self.name:
+            metrics.SINGLEFLIGHT_CALLS.inc(flight=self.name, role="leader" if leader else "waiter")
+
+        future = flight[0]
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                self.max_fan_out = max(self.max_fan_out, flight[1])
+            if self.name:
+                metrics.SINGLEFLIGHT_FAN_OUT.observe(flight[1], flight=self.name)
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "waits": self.waits,
+                "in_flight": len(self._in_flight),
+                "fan_out": round(self.calls / self.executions, 3) if self.executions else 0.0,
+                "max_fan_out": self.max_fan_out,
+            }
+
+def stats():
+    """Stats of every named SingleFlight, keyed by name."""
+    with _registry_lock:
+        flights = dict(_registry)
+    return {name: flight.stats() for name, flight in flights.items()}
@@ -0,0 +1,308 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import config
+
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdf_index (
+    pdf_hash        TEXT PRIMARY KEY,
+    chunk_count     INTEGER NOT NULL,
+    first_chunk_id  TEXT,
+    embedding_model TEXT NOT NULL,
+    indexed_at      REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS notes (
+    note_id      TEXT PRIMARY KEY,
+    user_id      TEXT NOT NULL,
+    topic        TEXT NOT NULL,
+    detail_level TEXT NOT NULL,
+    notes        TEXT NOT NULL,
+    created_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_user ON notes (user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS quizzes (
+    quiz_id    TEXT PRIMARY KEY,
+    user_id    TEXT NOT NULL,
+    topic      TEXT NOT NULL,
+    type       TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    quiz       TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quizzes_user ON quizzes (user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS generation_cache (
+    cache_key  TEXT PRIMARY KEY,
+    kind       TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS generation_cache_lru ON generation_cache (last_used);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id     TEXT PRIMARY KEY,
+    kind       TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    stage      TEXT,
+    result     TEXT,
+    error      TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+
+CREATE TABLE IF NOT EXISTS transcripts (
+    video_id   TEXT NOT NULL,
+    language   TEXT NOT NULL,
+    entries    BLOB NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (video_id, language)
+);
+
+CREATE TABLE IF NOT EXISTS embedding_vectors (
+    cache_key  TEXT PRIMARY KEY,
+    model      TEXT NOT NULL,
+    dim        INTEGER NOT NULL,
+    generation INTEGER NOT NULL,
+    row        INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embedding_vectors_generation ON embedding_vectors (model, dim, generation);
+
+CREATE TABLE IF NOT EXISTS context_usage (
+    kind             TEXT NOT NULL,
+    pdf_hash         TEXT NOT NULL,
+    variant          TEXT NOT NULL,
+    budget           INTEGER NOT NULL,
+    candidate_chunks INTEGER NOT NULL,
+    used_chunks      INTEGER NOT NULL,
+    duplicates       INTEGER NOT NULL,
+    candidate_tokens INTEGER NOT NULL,
+    context_tokens   INTEGER NOT NULL,
+    prompt_tokens    INTEGER NOT NULL,
+    created_at       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS context_usage_kind ON context_usage (kind, variant);
+
+CREATE TABLE IF NOT EXISTS quiz_attempts (
+    attempt_id TEXT PRIMARY KEY,
+    user_id    TEXT NOT NULL,
+    topic      TEXT NOT NULL,
+    type       TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    correct    INTEGER NOT NULL,
+    wrong      INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS quiz_rollups (
+    user_id   TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    bucket    TEXT NOT NULL,
+    quizzes   INTEGER NOT NULL,
+    correct   INTEGER NOT NULL,
+    wrong     INTEGER NOT NULL,
+    PRIMARY KEY (user_id, dimension, bucket)
+) WITHOUT ROWID;
+"""
+
+# ---------------------- CONNECTION ----------------------
+def get_connection():
+    """One SQLite connection per thread, in WAL mode so readers never block the writer."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != config.STORAGE_DB_PATH:
+        conn = sqlite3.connect(config.STORAGE_DB_PATH, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+        _local.path = config.STORAGE_DB_PATH
+    return conn
+
+# ---------------------- PDF INDEX MANIFEST ----------------------
+def get_pdf_index(pdf_hash):
+    """Manifest row for an indexed PDF, or None."""
+    row = get_connection().execute("SELECT * FROM pdf_index WHERE pdf_hash = ?", (pdf_hash,)).fetchone()
+    return dict(row) if row else None
+
+def record_pdf_index(pdf_hash, chunk_count, first_chunk_id, embedding_model):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO pdf_index (pdf_hash, chunk_count, first_chunk_id, embedding_model, indexed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (pdf_hash, chunk_count, first_chunk_id, embedding_model, time.time()),
+        )
+
+def delete_pdf_index(pdf_hash):
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM pdf_index WHERE pdf_hash = ?", (pdf_hash,))
+
+# ---------------------- NOTE HISTORY ----------------------
+def save_note(note_id, topic, detail_level, user_id, notes):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO notes (note_id, user_id, topic, detail_level, notes, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (note_id, user_id, topic, detail_level, notes, time.time()),
+        )
+
+# ---------------------- QUIZ HISTORY ----------------------
+def save_quiz(quiz_id, topic, quiz_type, difficulty, user_id, quiz):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO quizzes (quiz_id, user_id, topic, type, difficulty, quiz, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (quiz_id, user_id, topic, quiz_type, difficulty, quiz, time.time()),
+        )
+
+# ---------------------- VIDEO TRANSCRIPTS ----------------------
+def get_transcript(video_id, language):
+    """Cached timed transcript entries, or None."""
+    row = get_connection().execute(
+        "SELECT entries FROM transcripts WHERE video_id = ? AND language = ?", (video_id, language)
+    ).fetchone()
+    return json.loads(zlib.decompress(row["entries"])) if row else None
+
+def save_transcript(video_id, language, entries):
+    data = zlib.compress(json.dumps(entries, separators=(",", ":")).encode("utf-8"))
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO transcripts (video_id, language, entries, fetched_at) VALUES (?, ?, ?, ?)",
+            (video_id, language, data, time.time()),
+        )
+
+# ---------------------- CONTEXT USAGE ----------------------
+def record_context_usage(kind, pdf_hash, variant, budget, candidate_chunks, used_chunks, duplicates,
+                         candidate_tokens, context_tokens, prompt_tokens):
+    """One row per assembled prompt; variant is the detail level or quiz type."""
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO context_usage (kind, pdf_hash, variant, budget, candidate_chunks, used_chunks, duplicates, "
+            "candidate_tokens, context_tokens, prompt_tokens, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (kind, pdf_hash, variant, budget, candidate_chunks, used_chunks, duplicates,
+             candidate_tokens, context_tokens, prompt_tokens, time.time()),
+        )
+
+def context_usage_summary(since=0):
+    """Average token counts per (kind, variant) for prompts assembled after `since`."""
+    rows = get_connection().execute(
+        "SELECT kind, variant, COUNT(*) AS requests, MAX(budget) AS budget, "
+        "AVG(candidate_tokens) AS avg_candidate_tokens, AVG(context_tokens) AS avg_context_tokens, "
+        "AVG(prompt_tokens) AS avg_prompt_tokens, MAX(prompt_tokens) AS max_prompt_tokens, "
+        "AVG(used_chunks) AS avg_used_chunks, SUM(duplicates) AS duplicates "
+        "FROM context_usage WHERE created_at >= ? GROUP BY kind, variant ORDER BY kind, variant",
+        (since,),
+    ).fetchall()
+    return [
+        {key: round(value, 1) if isinstance(value, float) else value for key, value in dict(row).items()}
+        for row in rows
+    ]
+
+# ---------------------- QUIZ ANALYTICS ----------------------
+_ROLLUP_UPSERT = (
+    "INSERT INTO quiz_rollups (user_id, dimension, bucket, quizzes, correct, wrong) VALUES (?, ?, ?, 1, ?, ?) "
+    "ON CONFLICT (user_id, dimension, bucket) DO UPDATE SET "
+    "quizzes = quizzes + 1, correct = correct + excluded.correct, wrong = wrong + excluded.wrong"
+)
+
+def record_quiz_attempts(attempts):
+    """Log attempts and fold each new one into its rollups, in one transaction.
+
+    Each attempt is a dict with attempt_id, user_id, topic, type, difficulty,
+    correct, wrong, created_at and buckets: (user_id, dimension, bucket)
+    rollup rows it counts towards. Attempts whose id is already logged are
+    skipped, so replaying a backfill never double counts. Returns how many
+    attempts were new.
+    """
+    conn = get_connection()
+    added = 0
+    with conn:
+        for attempt in attempts:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO quiz_attempts (attempt_id, user_id, topic, type, difficulty, correct, wrong, "
+                "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (attempt["attempt_id"], attempt["user_id"], attempt["topic"], attempt["type"], attempt["difficulty"],
+                 attempt["correct"], attempt["wrong"], attempt["created_at"]),
+            )
+            if cursor.rowcount == 0:
+                continue
+            conn.executemany(
+                _ROLLUP_UPSERT,
+                [(user_id, dimension, bucket, attempt["correct"], attempt["wrong"])
+                 for user_id, dimension, bucket in attempt["buckets"]],
+            )
+            added += 1
+    return added
+
+def get_quiz_rollups(user_id):
+    """All rollup rows of one user, grouped by dimension: {dimension: [row, ...]} in bucket order."""
+    rows = get_connection().execute(
+        "SELECT dimension, bucket, quizzes, correct, wrong FROM quiz_rollups WHERE user_id = ? "
+        "ORDER BY dimension, bucket",
+        (user_id,),
+    ).fetchall()
+    rollups = {}
+    for row in rows:
+        rollups.setdefault(row["dimension"], []).append(dict(row))
+    return rollups
+
+def clear_quiz_analytics():
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM quiz_attempts")
+        conn.execute("DELETE FROM quiz_rollups")
+
+# ---------------------- JSON MIGRATION ----------------------
+def _load_json(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def migrate_json(notes_file="note_history.json", quizzes_file="quiz_history.json"):
+    """One-shot import of the old JSON history files. Existing rows are left untouched.
+
+    db_registry.json is not imported: it only listed hashes, and pdf_index
+    needs the chunk manifest, so those PDFs are re-indexed on first use.
+    """
+    notes = _load_json(notes_file)
+    quizzes = _load_json(quizzes_file)
+    now = time.time()
+
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO notes (note_id, user_id, topic, detail_level, notes, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(note_id, n.get("user_id", "guest"), n.get("topic", ""), n.get("detail_level", ""), n.get("notes", ""), now)
+             for note_id, n in notes.items()],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO quizzes (quiz_id, user_id, topic, type, difficulty, quiz, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(quiz_id, q.get("user_id", "guest"), q.get("topic", ""), q.get("type", ""), q.get("difficulty", ""), q.get("quiz", ""), now)
+             for quiz_id, q in quizzes.items()],
+        )
+    return {"notes": len(notes), "quizzes": len(quizzes)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import the old JSON history files into the SQLite store.")
+    parser.add_argument("--notes", default="note_history.json")
+    parser.add_argument("--quizzes", default="quiz_history.json")
+    args = parser.parse_args()
+    counts = migrate_json(args.notes, args.quizzes)
+    print(f"Imported {counts['notes']} notes and {counts['quizzes']} quizzes into {config.STORAGE_DB_PATH}.")
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+# config reads the environment at import, so point every store at a scratch
+# directory and select the offline fake backends before anything imports it
+STATE_DIR = tempfile.mkdtemp(prefix="studymate-tests-")
+os.environ.update({
+    "MODEL_BACKEND": "fake",
+    "FAKE_EMBED_LATENCY": "0",
+    "FAKE_LLM_LATENCY": "0",
+    "STORAGE_DB_PATH": os.path.join(STATE_DIR, "studymate.db"),
+    "CHROMA_PATH": os.path.join(STATE_DIR, "chroma_db"),
+    "LEXICAL_INDEX_DIR": os.path.join(STATE_DIR, "lexical_index"),
+    "EMBEDDING_CACHE_DIR": os.path.join(STATE_DIR, "embedding_cache"),
+    "TEXT_CACHE_DIR": os.path.join(STATE_DIR, "text_cache"),
+    "METRICS_ENABLED": "0",
+})
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,35 @@
+import config
+from context_builder import build_context
+
+PAGE = "".join(f"Sentence {i:04d} about graphs and trees. " for i in range(200))
+
+def _chunk(offset, size=1500, page=1):
+    return {"page": page, "offset": offset, "text": PAGE[offset:offset + size]}
+
+def _covered(context):
+    return [(chunk["offset"], chunk["offset"] + len(chunk["text"])) for chunk in context.chunks]
+
+def test_adjacent_overlapping_chunks_are_sent_once():
+    chunks = [_chunk(0), _chunk(1200), _chunk(2400)]
+    context = build_context(chunks, budget=10_000, dedupe_threshold=1.1)
+    ranges = _covered(context)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 3900
+    assert all(end <= next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert sum(len(chunk["text"]) for chunk in context.chunks) <= 3900
+    assert context.duplicates == 0
+
+def test_overlap_is_trimmed_whatever_the_rank_order():
+    chunks = [_chunk(2400), _chunk(0), _chunk(1200), _chunk(600)]
+    context = build_context(chunks, budget=10_000, dedupe_threshold=1.1)
+    ranges = _covered(context)
+    assert all(end <= next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert context.duplicates == 1  # the chunk at 600 lies inside the first two
+
+def test_chunks_on_other_pages_are_not_trimmed():
+    chunks = [_chunk(0), _chunk(0, page=2)]
+    context = build_context(chunks, budget=10_000, dedupe_threshold=1.1)
+    assert [len(chunk["text"]) for chunk in context.chunks] == [1500, 1500]
+
+def test_budget_truncates_the_last_chunk():
+    context = build_context([_chunk(0), _chunk(1200)], budget=config.CONTEXT_MIN_PIECE_TOKENS + 400)
+    assert context.context_tokens <= context.budget
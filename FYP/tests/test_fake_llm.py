@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from llm import FakeGenerativeModel
+from quiz_gen import QUIZ_TYPES, get_prompt
+from quiz_schema import parse_quiz
+
+PASSAGE = ("A multiple-choice exam on graphs: Dijkstra's algorithm finds shortest paths, "
+           "breadth-first search explores level by level, and a heap orders the frontier.")
+JSON_CONFIG = {"response_mime_type": "application/json"}
+
+@pytest.fixture
+def model():
+    return FakeGenerativeModel("fake-llm", latency=0, tokens_per_second=1e9, failure_rate=0, seed=1)
+
+@pytest.mark.parametrize("quiz_type", QUIZ_TYPES)
+def test_json_mode_quiz_matches_the_requested_type(model, quiz_type):
+    prompt = get_prompt(PASSAGE, "shortest paths", quiz_type, "Easy", json_mode=True)
+    text = model.generate_content(prompt, generation_config=JSON_CONFIG).text
+    items = json.loads(text)
+    parsed = parse_quiz(text, quiz_type)
+    assert (len(parsed.items), parsed.dropped) == (5, 0)
+    assert all(bool(item["options"]) == (quiz_type == "mcq") for item in items)
+
+@pytest.mark.parametrize("quiz_type", QUIZ_TYPES)
+def test_text_mode_quiz_matches_the_requested_type(model, quiz_type):
+    prompt = get_prompt(PASSAGE, "shortest paths", quiz_type, "Easy")
+    parsed = parse_quiz(model.generate_content(prompt).text, quiz_type)
+    assert (len(parsed.items), parsed.dropped) == (5, 0)
+
+def test_notes_prompt_gets_notes(model):
+    text = model.generate_content('TASK: Generate detailed notes on the topic "graphs".\n' + PASSAGE).text
+    assert text.startswith("## Key points")
@@ -0,0 +1,95 @@
+import pytest
+
+import config
+import lexical_index
+from lexical_index import LexicalIndex
+
+CHUNKS = {
+    "h:1:0": "Dijkstra's algorithm finds shortest paths from one source in a weighted graph.",
+    "h:1:1": "A binary search tree keeps keys ordered; an AVL tree rebalances it after every insert.",
+    "h:2:0": "Breadth-first search explores a graph level by level using a queue.",
+    "h:2:1": "Graph graph graph: adjacency lists and adjacency matrices both represent a graph.",
+}
+
+@pytest.fixture
+def index():
+    index = LexicalIndex("h")
+    for chunk_id, text in CHUNKS.items():
+        index.add(chunk_id, text)
+    return index
+
+# ---------------------- BM25 ----------------------
+def test_bm25_ranks_the_chunk_containing_rare_terms_first(index):
+    ids = [chunk_id for chunk_id, _ in index.search("shortest paths dijkstra", top_k=3)]
+    assert ids[0] == "h:1:0"
+
+def test_bm25_term_frequency_raises_score(index):
+    scores = dict(index.search("graph", top_k=4))
+    assert max(scores, key=scores.get) == "h:2:1"
+    assert "h:1:1" not in scores  # no mention of graph at all
+
+def test_bm25_ignores_stopwords_and_unknown_terms(index):
+    assert index.search("the of and", top_k=5) == []
+    assert index.search("quantum", top_k=5) == []
+
+def test_index_round_trips_through_json(index):
+    restored = LexicalIndex.from_json("h", index.to_json())
+    assert restored.search("avl tree", top_k=2) == index.search("avl tree", top_k=2)
+
+# ---------------------- RECIPROCAL RANK FUSION ----------------------
+def test_rrf_prefers_items_ranked_well_by_both_lists():
+    vector_store = pytest.importorskip("vector_store")
+    fused = vector_store.reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]], k=60)
+    assert fused == ["b", "a", "c"]
+
+def test_rrf_keeps_items_found_by_only_one_list():
+    vector_store = pytest.importorskip("vector_store")
+    fused = vector_store.reciprocal_rank_fusion([["a", "b"], ["c"]], k=60)
+    assert fused[:2] == ["a", "c"] and set(fused) == {"a", "b", "c"}
+
+# ---------------------- EXACT-MATCH FAST PATH ----------------------
+def test_exact_match_needs_every_term_in_one_chunk(index):
+    assert index.is_exact_match("AVL tree")
+    assert index.is_exact_match("Dijkstra")
+    assert not index.is_exact_match("AVL queue")           # both terms exist, never together
+    assert not index.is_exact_match("red black tree")     # "red" is not in the book
+    assert not index.is_exact_match("graph search queue level source", max_terms=3)
+
+@pytest.fixture
+def book():
+    vector_store = pytest.importorskip("vector_store")
+    pdf_hash = "fastpathbook"
+    pages = [(page_no, " ".join(CHUNKS.values()) * 3) for page_no in range(1, 4)]
+    db = vector_store.get_book_collection(pdf_hash)
+    vector_store.index_pdf_chunks(db, pdf_hash, pages, source="test.pdf", user_id="tester")
+    yield vector_store, db, pdf_hash
+    lexical_index.delete_index(pdf_hash)
+
+@pytest.fixture
+def vector_queries(book, monkeypatch):
+    vector_store = book[0]
+    calls = []
+    embed = vector_store.query_embed_fn
+
+    def counting_embed(topics):
+        calls.append(list(topics))
+        return embed(topics)
+
+    monkeypatch.setattr(vector_store, "query_embed_fn", counting_embed)
+    return calls
+
+def test_fast_path_skips_the_vector_query_for_exact_topics(book, vector_queries, monkeypatch):
+    vector_store, db, pdf_hash = book
+    monkeypatch.setattr(config, "LEXICAL_FAST_PATH", True)
+    chunks = vector_store.retrieve_chunks(db, pdf_hash, "AVL tree", mode="hybrid")
+    assert chunks and "AVL" in chunks[0]["text"]
+    assert vector_queries == []
+
+    vector_store.retrieve_chunks(db, pdf_hash, "how do balanced structures stay efficient", mode="hybrid")
+    assert vector_queries == [["how do balanced structures stay efficient"]]
+
+def test_fast_path_can_be_disabled(book, vector_queries, monkeypatch):
+    vector_store, db, pdf_hash = book
+    monkeypatch.setattr(config, "LEXICAL_FAST_PATH", False)
+    vector_store.retrieve_chunks(db, pdf_hash, "AVL tree", mode="hybrid")
+    assert vector_queries == [["AVL tree"]]
@@ -0,0 +1,41 @@
+import threading
+import time
+
+import quiz_gen
+from quiz_schema import parse_quiz
+
+def test_concurrent_batches_share_one_cap_on_model_calls(monkeypatch):
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def complete_quiz(cache_key, prompt, chunks, quiz_type, regenerate=False, json_mode=False):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.05)
+        with lock:
+            state["running"] -= 1
+        raw = "Q1. The sun is a planet.\nAnswer: False"
+        return raw, parse_quiz(raw, quiz_type)
+
+    chunk = {"id": "h:1:0", "page": 1, "offset": 0, "text": "The sun is a star at the centre of the solar system."}
+    monkeypatch.setattr(quiz_gen, "_batch_slots", threading.BoundedSemaphore(2))
+    monkeypatch.setattr(quiz_gen, "get_pdf_hash", lambda path: "h")
+    monkeypatch.setattr(quiz_gen, "get_book_collection", lambda pdf_hash: None)
+    monkeypatch.setattr(quiz_gen, "index_pdf_if_needed", lambda *args: None)
+    monkeypatch.setattr(quiz_gen, "retrieve_chunks_many", lambda db, pdf_hash, topics, **kwargs: [[chunk] for _ in topics])
+    monkeypatch.setattr(quiz_gen, "complete_quiz", complete_quiz)
+
+    def batch(name):
+        specs = [{"topic": f"{name} topic {i}", "quizType": "true_false"} for i in range(4)]
+        results[name] = quiz_gen.generate_quiz_batch("book.pdf", specs, user_id=name)
+
+    results = {}
+    threads = [threading.Thread(target=batch, args=(name,)) for name in ("first", "second")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state["peak"] == 2
+    assert all(result["success"] for name in results for result in results[name])
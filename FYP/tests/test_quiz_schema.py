@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from quiz_schema import format_quiz_text, parse_quiz
+
+MCQ = """Okay, here are the questions:
+
+Q1. Which structure gives O(1) insertion at the head?
+A) A linked list
+B) An array
+C) A heap
+D) A binary search tree
+Answer: {answer}
+"""
+
+@pytest.mark.parametrize("answer", ["A", "A)", "(A)", "a.", "A) A linked list"])
+def test_mcq_answer_letter_spellings(answer):
+    parsed = parse_quiz(MCQ.format(answer=answer), "mcq")
+    assert [(item.answer, item.answer_index) for item in parsed.items] == [("A", 0)]
+
+def test_mcq_free_text_answer_is_matched_by_option_text_not_first_letter():
+    parsed = parse_quiz(MCQ.format(answer="An array"), "mcq")
+    assert [(item.answer, item.answer_index) for item in parsed.items] == [("B", 1)]
+    assert parsed.repaired == 1
+
+def test_mcq_free_text_answer_starting_with_a_letter_word_is_not_option_a():
+    text = MCQ.replace("A) A linked list", "A) Singly linked list").format(answer="A linked list")
+    parsed = parse_quiz(text, "mcq")
+    assert parsed.items == [] and parsed.dropped == 1
+
+def test_json_and_text_forms_parse_to_the_same_quiz():
+    items = [{"question": "The sun is a planet.", "options": [], "answer": "false"},
+             {"question": "Water boils at 100 C at sea level.", "options": [], "answer": "True"}]
+    from_json = parse_quiz(json.dumps(items), "true_false")
+    from_text = parse_quiz(format_quiz_text(from_json), "true_false")
+    assert [item.answer for item in from_text.items] == ["False", "True"]
+    assert from_text.items == from_json.items
@@ -0,0 +1,20 @@
+import os
+
+import text_cache
+
+def test_pages_round_trip(tmp_path):
+    pages = [(1, "First page."), (2, "")]
+    text_cache.save_pages("h", pages, cache_dir=str(tmp_path))
+    assert text_cache.load_pages("h", cache_dir=str(tmp_path)) == pages
+    assert text_cache.load_pages("other", cache_dir=str(tmp_path)) is None
+
+def test_hit_survives_the_file_being_pruned_after_it_was_read(tmp_path, monkeypatch):
+    text_cache.save_pages("h", [(1, "Text.")], cache_dir=str(tmp_path))
+    real_utime = os.utime
+
+    def utime(path, *args, **kwargs):
+        os.remove(path)  # a concurrent prune got there first
+        return real_utime(path, *args, **kwargs)
+
+    monkeypatch.setattr(text_cache.os, "utime", utime)
+    assert text_cache.load_pages("h", cache_dir=str(tmp_path)) == [(1, "Text.")]
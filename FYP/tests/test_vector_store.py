@@ -0,0 +1,41 @@
+import threading
+import time
+
+import pytest
+
+vector_store = pytest.importorskip("vector_store")
+import storage
+
+PAGES = [(page_no, f"Page {page_no} explains heaps, priority queues and heapsort in detail. " * 40)
+         for page_no in range(1, 5)]
+
+def test_concurrent_cold_requests_index_a_book_once():
+    pdf_hash = "concurrentbook"
+    db = vector_store.get_book_collection(pdf_hash)
+    loads = []
+
+    def load_pages():
+        loads.append(threading.get_ident())
+        time.sleep(0.2)  # keep the first run in flight while the others arrive
+        return PAGES
+
+    threads = [
+        threading.Thread(target=vector_store.ensure_pdf_indexed, args=(db, pdf_hash, load_pages, "book.pdf", f"user{i}"))
+        for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    entry = storage.get_pdf_index(pdf_hash)
+    assert entry["chunk_count"] > 0 and db.count() == entry["chunk_count"]
+    assert vector_store.ensure_pdf_indexed(db, pdf_hash, load_pages, "book.pdf", "late") is False
+
+def test_textless_book_skips_the_shared_collection_migration(monkeypatch):
+    pdf_hash = "textlessbook"
+    storage.record_pdf_index(pdf_hash, 0, None, "fake-embedding")
+    monkeypatch.setattr(vector_store, "_move_from_shared_collection",
+                        lambda db, pdf_hash: pytest.fail("scanned the shared collection"))
+    vector_store.get_book_collection(pdf_hash)
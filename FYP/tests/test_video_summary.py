@@ -0,0 +1,56 @@
+import pytest
+
+import llm
+import yt_summerization
+from yt_summerization import SummaryError
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+class _Model:
+    """Answers every prompt with the same text and counts the calls."""
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        return _Response(self.text)
+
+@pytest.fixture
+def model(monkeypatch):
+    model = _Model("")
+    monkeypatch.setattr(llm, "get_model", lambda *args, **kwargs: model)
+    return model
+
+SEGMENT = {"start": 0.0, "end": 300.0, "text": "Merge sort splits the list in half, sorts both halves and merges them."}
+
+def test_empty_segment_summary_raises_and_is_not_cached(model):
+    with pytest.raises(SummaryError):
+        yt_summerization.summarize_segment(SEGMENT)
+    model.text = "- Merge sort divides and conquers."
+    assert yt_summerization.summarize_segment(SEGMENT) == "- Merge sort divides and conquers."
+    assert model.calls == 2  # the empty answer was not served from the cache
+
+def test_failed_segment_fails_the_whole_summary(model, monkeypatch):
+    monkeypatch.setattr(yt_summerization.config, "SUMMARY_SINGLE_PASS_CHARS", 10)
+    entries = [{"text": f"Sentence number {i} about sorting.", "start": i * 30.0, "duration": 30.0} for i in range(40)]
+    with pytest.raises(SummaryError):
+        yt_summerization.summarize_entries(entries)
+
+def test_transcript_language_code_reaches_youtube_unchanged_and_caches_case_insensitively(monkeypatch):
+    requested = []
+
+    class _Api:
+        @staticmethod
+        def get_transcript(video_id, languages):
+            requested.append(languages)
+            return [{"text": "你好", "start": 0.0, "duration": 2.0}]
+
+    monkeypatch.setattr(yt_summerization, "YouTubeTranscriptApi", _Api)
+    first = yt_summerization.fetch_transcript("abcdefghijk", "zh-Hans")
+    second = yt_summerization.fetch_transcript("abcdefghijk", "ZH-HANS")
+    assert requested == [["zh-Hans"]]
+    assert first == second
@@ -0,0 +1,136 @@
+import argparse
+import gzip
+import json
+import os
+import threading
+
+import config
+import metrics
+from pdf_text import EXTRACTOR_VERSION, iter_pages_from_pdf
+
+_lock = threading.Lock()
+
+# ---------------------- CACHE FILES ----------------------
+def _cache_path(pdf_hash, version=EXTRACTOR_VERSION, cache_dir=None):
+    return os.path.join(cache_dir or config.TEXT_CACHE_DIR, f"{pdf_hash}.v{version}.json.gz")
+
+def _entries(cache_dir=None):
+    """All cache files as (path, size, last_used), least recently used first."""
+    cache_dir = cache_dir or config.TEXT_CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return []
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".json.gz"):
+            path = os.path.join(cache_dir, name)
+            stat = os.stat(path)
+            entries.append((path, stat.st_size, stat.st_mtime))
+    return sorted(entries, key=lambda entry: entry[2])
+
+def load_pages(pdf_hash, cache_dir=None):
+    """Return cached [(page_no, text), ...] for this PDF, or None on a miss."""
+    path = _cache_path(pdf_hash, cache_dir=cache_dir)
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            pages = [tuple(page) for page in json.load(f)]
+    except (OSError, ValueError):
+        metrics.cache_lookup("text", False)
+        return None
+    metrics.cache_lookup("text", True)
+    try:
+        os.utime(path)  # mark as recently used for LRU eviction
+    except OSError:
+        pass  # pruned since it was read; the pages are still good
+    return pages
+
+def save_pages(pdf_hash, pages, cache_dir=None):
+    """Store per-page text compressed on disk, then evict down to the size limit."""
+    cache_dir = cache_dir or config.TEXT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(pdf_hash, cache_dir=cache_dir)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump([[page_no, text] for page_no, text in pages], f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    prune(cache_dir=cache_dir)
+
+def delete_pages(pdf_hash, cache_dir=None):
+    try:
+        os.remove(_cache_path(pdf_hash, cache_dir=cache_dir))
+    except FileNotFoundError:
+        pass
+
+def prune(max_bytes=None, cache_dir=None):
+    """Delete least recently used entries until the cache fits in max_bytes. Returns files removed."""
+    max_bytes = config.TEXT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    removed = 0
+    with _lock:
+        entries = _entries(cache_dir)
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+    return removed
+
+# ---------------------- CACHED EXTRACTION ----------------------
+def cached_pages(pdf_path, pdf_hash):
+    """Yield (page_no, text) from the cache, or extract and cache them on a miss.
+
+    The cache is only written once the extractor has been fully consumed, so
+    an interrupted extraction never leaves a partial entry behind.
+    """
+    pages = load_pages(pdf_hash)
+    if pages is not None:
+        print("Using cached extracted text.")
+        yield from pages
+        return
+
+    extracted = []
+    for page in iter_pages_from_pdf(pdf_path):
+        extracted.append(page)
+        yield page
+    save_pages(pdf_hash, extracted)
+
+# ---------------------- CLI ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and prune the extracted-text cache.")
+    parser.add_argument("--dir", default=config.TEXT_CACHE_DIR, help="cache directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="list entries, least recently used first")
+    sub.add_parser("stats", help="show entry count and total size")
+    prune_cmd = sub.add_parser("prune", help="evict LRU entries down to a size limit")
+    prune_cmd.add_argument("--max-bytes", type=int, default=config.TEXT_CACHE_MAX_BYTES)
+    sub.add_parser("clear", help="remove every entry")
+    show_cmd = sub.add_parser("show", help="print the cached text of one PDF")
+    show_cmd.add_argument("pdf_hash")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for path, size, last_used in _entries(args.dir):
+            print(f"{os.path.basename(path)}\t{size}\t{last_used:.0f}")
+    elif args.command == "stats":
+        entries = _entries(args.dir)
+        print(f"Entries: {len(entries)}")
+        print(f"Total bytes: {sum(size for _, size, _ in entries)}")
+    elif args.command == "prune":
+        print(f"Removed {prune(args.max_bytes, cache_dir=args.dir)} entries.")
+    elif args.command == "clear":
+        print(f"Removed {prune(0, cache_dir=args.dir)} entries.")
+    elif args.command == "show":
+        pages = load_pages(args.pdf_hash, cache_dir=args.dir)
+        if pages is None:
+            print("Not cached.")
+            return 1
+        for page_no, text in pages:
+            print(f"--- page {page_no} ---")
+            print(text)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
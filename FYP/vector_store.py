@@ -0,0 +1,282 @@
+import threading
+from collections import OrderedDict
+
+import chromadb
+from chromadb.utils.embedding_functions import EmbeddingFunction
+
+import config
+import lexical_index
+import metrics
+import progress
+import storage
+from embedding_cache import get_embedding_cache
+from embeddings import get_embedding_client
+from chunking import batched, chunk_pages, estimate_tokens
+from singleflight import SingleFlight
+
+_lock = threading.Lock()
+_client = None
+_collections = {}
+_book_collections = OrderedDict()  # pdf_hash -> open collection, most recently used last
+# Concurrent cold requests for one book share a single indexing run
+_index_flights = SingleFlight("index")
+
+# ---------------------- EMBEDDING FUNCTION ----------------------
+class GeminiEmbeddingFunction(EmbeddingFunction):
+    def __init__(self, document_mode=True):
+        self.document_mode = document_mode
+
+    def __call__(self, input):
+        embedding_task = "retrieval_document" if self.document_mode else "retrieval_query"
+        return get_embedding_cache().embed(get_embedding_client(), input, embedding_task)
+
+# Separate instances for documents and queries, so concurrent requests never
+# flip a shared document_mode flag under each other.
+document_embed_fn = GeminiEmbeddingFunction(document_mode=True)
+query_embed_fn = GeminiEmbeddingFunction(document_mode=False)
+
+# ---------------------- CHROMA CLIENT ----------------------
+def get_client():
+    """Return the process-wide PersistentClient, opening it on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = chromadb.PersistentClient(path=config.CHROMA_PATH)
+        return _client
+
+def get_collection(name=None):
+    """Return a cached collection that embeds documents with the Gemini document task."""
+    name = name or config.COLLECTION_NAME
+    client = get_client()
+    with _lock:
+        if name not in _collections:
+            _collections[name] = client.get_or_create_collection(name=name, embedding_function=document_embed_fn)
+        return _collections[name]
+
+def book_collection_name(pdf_hash):
+    """Chroma collection holding one book's chunks (names allow 3-63 of [A-Za-z0-9._-])."""
+    return f"{config.BOOK_COLLECTION_PREFIX}{pdf_hash}"[:63]
+
+def get_book_collection(pdf_hash):
+    """Return the collection to index and query this book in.
+
+    With COLLECTION_PER_BOOK each PDF hash gets its own collection, so queries
+    only ever touch that book's vectors. Open collections are kept in an LRU
+    of OPEN_COLLECTIONS_MAX entries; evicted ones are reopened on demand.
+    """
+    if not config.COLLECTION_PER_BOOK:
+        return get_collection()
+
+    with _lock:
+        if pdf_hash in _book_collections:
+            _book_collections.move_to_end(pdf_hash)
+            return _book_collections[pdf_hash]
+
+    client = get_client()
+    db = client.get_or_create_collection(name=book_collection_name(pdf_hash), embedding_function=document_embed_fn)
+    entry = storage.get_pdf_index(pdf_hash)
+    # A book that indexed to no chunks (no text) has nothing to move; don't rescan the shared collection for it
+    if entry is not None and entry["chunk_count"] and db.count() == 0:
+        _move_from_shared_collection(db, pdf_hash)
+
+    with _lock:
+        db = _book_collections.setdefault(pdf_hash, db)
+        _book_collections.move_to_end(pdf_hash)
+        while len(_book_collections) > config.OPEN_COLLECTIONS_MAX:
+            _book_collections.popitem(last=False)
+    return db
+
+def delete_book_collection(pdf_hash):
+    """Forget one book's vectors: its collection, manifest row and lexical index. It is re-indexed on next use."""
+    with _lock:
+        _book_collections.pop(pdf_hash, None)
+    try:
+        get_client().delete_collection(book_collection_name(pdf_hash))
+    except Exception:
+        pass  # never indexed
+    storage.delete_pdf_index(pdf_hash)
+    lexical_index.delete_index(pdf_hash)
+
+def _move_from_shared_collection(db, pdf_hash):
+    """Copy a book indexed before sharding out of the shared collection, reusing its stored vectors."""
+    shared = get_collection()
+    stored = shared.get(where={"pdf_hash": pdf_hash}, include=["documents", "metadatas", "embeddings"])
+    if not stored["ids"]:
+        return
+    for start in range(0, len(stored["ids"]), config.INDEX_BATCH_SIZE):
+        end = start + config.INDEX_BATCH_SIZE
+        db.add(
+            ids=stored["ids"][start:end],
+            documents=stored["documents"][start:end],
+            metadatas=stored["metadatas"][start:end],
+            embeddings=[list(vector) for vector in stored["embeddings"][start:end]],
+        )
+    shared.delete(where={"pdf_hash": pdf_hash})
+    print(f"Moved {len(stored['ids'])} chunks into {db.name}.")
+
+def _book_filter(db, pdf_hash):
+    """Metadata filter scoping a query to one book; unnecessary inside the book's own collection."""
+    return None if db.name == book_collection_name(pdf_hash) else {"pdf_hash": pdf_hash}
+
+# ---------------------- CHUNKED INDEXING ----------------------
+def is_pdf_indexed(db, pdf_hash):
+    """O(1) check: a manifest row for the current embedding model, confirmed by an ID lookup in Chroma."""
+    entry = storage.get_pdf_index(pdf_hash)
+    if entry is None or entry["embedding_model"] != get_embedding_client().model:
+        return False
+    if not entry["first_chunk_id"]:
+        return True  # indexed, but the PDF had no text
+    return bool(db.get(ids=[entry["first_chunk_id"]], include=[]).get("ids"))
+
+def index_pdf_chunks(db, pdf_hash, pages, source, user_id, batch_size=None):
+    """Chunk the extracted pages and add them to Chroma in INDEX_BATCH_SIZE batches."""
+    batch_size = batch_size or config.INDEX_BATCH_SIZE
+
+    # Drop chunks left by an interrupted run or an older embedding model
+    storage.delete_pdf_index(pdf_hash)
+    db.delete(where={"pdf_hash": pdf_hash})
+    lexical_index.delete_index(pdf_hash)
+
+    lexical = lexical_index.LexicalIndex(pdf_hash)
+    total = 0
+    first_chunk_id = None
+    for batch in batched(chunk_pages(pages, pdf_hash), batch_size):
+        progress.set_stage("indexing")
+        documents = [chunk["text"] for chunk in batch]
+        # Embedded up front rather than inside db.add, so embedding and Chroma time are measured apart
+        embeddings = document_embed_fn(documents)
+        with metrics.stage("chroma_add"):
+            db.add(
+                documents=documents,
+                embeddings=embeddings,
+                ids=[chunk["id"] for chunk in batch],
+                metadatas=[
+                    {"source": source, "user_id": user_id, "pdf_hash": pdf_hash,
+                     "page": chunk["page"], "offset": chunk["offset"]}
+                    for chunk in batch
+                ],
+            )
+        for chunk in batch:
+            lexical.add(chunk["id"], chunk["text"])
+        first_chunk_id = first_chunk_id or batch[0]["id"]
+        total += len(batch)
+
+    lexical_index.save_index(lexical)
+    storage.record_pdf_index(pdf_hash, total, first_chunk_id, get_embedding_client().model)
+    print(f"Indexed {total} chunks.")
+    return total
+
+def ensure_pdf_indexed(db, pdf_hash, load_pages, source, user_id):
+    """Index the PDF unless it already is. Returns True if it had to be indexed.
+
+    index_pdf_chunks starts by deleting the book's chunks, so two requests
+    indexing the same cold book at once would delete each other's work.
+    Concurrent callers for one pdf_hash therefore share a single run, which
+    re-checks the manifest first in case a run finished just before it.
+    load_pages() is only called by the run that indexes.
+    """
+    if is_pdf_indexed(db, pdf_hash):
+        return False
+
+    def index():
+        if is_pdf_indexed(db, pdf_hash):
+            return False
+        index_pdf_chunks(db, pdf_hash, load_pages(), source=source, user_id=user_id)
+        return True
+
+    return _index_flights.do(pdf_hash, index)
+
+def _within_budget(ids, documents, metadatas, token_budget):
+    chunks = []
+    used = 0
+    for chunk_id, text, meta in zip(ids, documents, metadatas):
+        tokens = estimate_tokens(text)
+        if chunks and used + tokens > token_budget:
+            break
+        chunks.append({"id": chunk_id, "text": text, "page": meta.get("page"), "offset": meta.get("offset")})
+        used += tokens
+    return chunks
+
+def get_lexical_index(db, pdf_hash):
+    """The PDF's BM25 index, rebuilt from the stored chunks for books indexed before it existed."""
+    index = lexical_index.load_index(pdf_hash)
+    if index is None:
+        stored = db.get(where=_book_filter(db, pdf_hash), include=["documents"])
+        index = lexical_index.LexicalIndex(pdf_hash)
+        for chunk_id, text in zip(stored["ids"], stored["documents"]):
+            index.add(chunk_id, text)
+        lexical_index.save_index(index)
+    return index
+
+def reciprocal_rank_fusion(rankings, k=None):
+    """Fuse several best-first lists of IDs: score(id) = sum of 1 / (k + rank)."""
+    k = k or config.RRF_K
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+def retrieve_chunks(db, pdf_hash, topic, top_k=None, token_budget=None, mode=None):
+    """Return the most relevant chunks of one PDF, best first, within a token budget."""
+    return retrieve_chunks_many(db, pdf_hash, [topic], top_k, token_budget, mode)[0]
+
+def retrieve_chunks_many(db, pdf_hash, topics, top_k=None, token_budget=None, mode=None):
+    """retrieve_chunks for several topics: one batched embedding call and one Chroma query.
+
+    mode is "vector", "lexical" or "hybrid" (RETRIEVAL_MODE). In hybrid mode the
+    BM25 and vector rankings are merged with reciprocal rank fusion, and short
+    topics that match terms in the book exactly skip the embedding call.
+    """
+    top_k = top_k or config.RETRIEVAL_TOP_K
+    token_budget = token_budget or config.RETRIEVAL_TOKEN_BUDGET
+    mode = mode or config.RETRIEVAL_MODE
+    topics = list(topics)
+    if not topics:
+        return []
+
+    candidates = top_k * 2 if mode == "hybrid" else top_k
+    lexical = get_lexical_index(db, pdf_hash) if mode in ("hybrid", "lexical") else None
+    lexical_rankings = [[chunk_id for chunk_id, _ in lexical.search(topic, candidates)] if lexical else [] for topic in topics]
+    needs_vector = [
+        mode == "vector" or (mode == "hybrid" and not (config.LEXICAL_FAST_PATH and lexical.is_exact_match(topic)))
+        for topic in topics
+    ]
+
+    texts = {}
+    vector_rankings = [[] for _ in topics]
+    vector_topics = [topic for topic, needed in zip(topics, needs_vector) if needed]
+    if vector_topics:
+        query_embeddings = query_embed_fn(vector_topics)
+        with metrics.stage("chroma_query"):
+            result = db.query(query_embeddings=query_embeddings, n_results=candidates, where=_book_filter(db, pdf_hash))
+        rows = iter(zip(result["ids"], result["documents"], result["metadatas"]) if result.get("documents") else [])
+        for i, needed in enumerate(needs_vector):
+            if not needed:
+                continue
+            ids, documents, metadatas = next(rows, ([], [], []))
+            vector_rankings[i] = list(ids)
+            texts.update((chunk_id, (text, meta)) for chunk_id, text, meta in zip(ids, documents, metadatas))
+
+    rankings = [
+        reciprocal_rank_fusion([vector_ranking, lexical_ranking])[:top_k] if vector_ranking and lexical_ranking
+        else (vector_ranking or lexical_ranking)[:top_k]
+        for vector_ranking, lexical_ranking in zip(vector_rankings, lexical_rankings)
+    ]
+
+    # Lexical-only hits still need their text; one ID lookup, no embedding
+    missing = list({chunk_id for ranking in rankings for chunk_id in ranking if chunk_id not in texts})
+    if missing:
+        with metrics.stage("chroma_query"):
+            stored = db.get(ids=missing, include=["documents", "metadatas"])
+        texts.update((chunk_id, (text, meta)) for chunk_id, text, meta in zip(stored["ids"], stored["documents"], stored["metadatas"]))
+
+    return [
+        _within_budget(
+            [chunk_id for chunk_id in ranking if chunk_id in texts],
+            [texts[chunk_id][0] for chunk_id in ranking if chunk_id in texts],
+            [texts[chunk_id][1] or {} for chunk_id in ranking if chunk_id in texts],
+            token_budget,
+        )
+        for ranking in rankings
+    ]
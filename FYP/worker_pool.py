@@ -0,0 +1,113 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as JobTimeoutError
+
+import config
+
+# ---------------------- GENERATION POOL ----------------------
+class GenerationPool:
+    """Long-lived pool that runs the generators in-process.
+
+    The generator modules are imported once, so chromadb, the Gemini SDK,
+    PyPDF2 and pytesseract are loaded a single time and the cached Chroma
+    client / Gemini model objects stay warm between requests. Jobs run on
+    threads: the heavy lifting is network calls and the tesseract
+    subprocess, both of which release the GIL.
+    """
+
+    def __init__(self, max_workers=None, timeout=None):
+        self.max_workers = max_workers or config.WORKER_POOL_SIZE
+        self.timeout = timeout if timeout is not None else config.JOB_TIMEOUT
+        self._executor = None
+        self._lock = threading.Lock()
+
+        import note_gen
+        import quiz_gen
+        import yt_summerization
+        self.jobs = {
+            "notes": note_gen.generate_notes,
+            "quiz": quiz_gen.generate_quiz,
+            "quiz_batch": quiz_gen.generate_quiz_batch,
+            "video": yt_summerization.summarize_video,
+        }
+        self.stream_jobs = {
+            "notes": note_gen.stream_notes,
+            "quiz": quiz_gen.stream_quiz,
+        }
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="generation")
+            return self._executor
+
+    def warm_up(self):
+        """Open the Chroma client and build the Gemini model ahead of the first request."""
+        import llm
+        import vector_store
+        llm.get_model()
+        vector_store.get_collection()
+
+    def submit(self, job, *args, **kwargs):
+        """Schedule a job by name and return its Future."""
+        if job not in self.jobs:
+            raise ValueError(f"Unknown job: {job}")
+        return self._get_executor().submit(self.jobs[job], *args, **kwargs)
+
+    def submit_call(self, fn, *args, **kwargs):
+        """Schedule an arbitrary callable on the pool (used by the background job manager)."""
+        return self._get_executor().submit(fn, *args, **kwargs)
+
+    def run(self, job, *args, timeout=None, **kwargs):
+        """Run a job and wait for it, raising concurrent.futures.TimeoutError after the per-job timeout."""
+        future = self.submit(job, *args, **kwargs)
+        return future.result(timeout=timeout if timeout is not None else self.timeout)
+
+    def stream(self, job, *args, timeout=None, **kwargs):
+        """Run a streaming job on the pool and yield its pieces in the caller's thread.
+
+        The generator itself runs on a pool thread, so streaming requests
+        count against the same cap as every other job. timeout bounds the
+        wait for each next piece, not the whole stream.
+        """
+        if job not in self.stream_jobs:
+            raise ValueError(f"Unknown streaming job: {job}")
+        timeout = timeout if timeout is not None else self.timeout
+        pieces = queue.Queue()
+        done = object()
+        cancelled = threading.Event()
+
+        def produce():
+            try:
+                for piece in self.stream_jobs[job](*args, **kwargs):
+                    if cancelled.is_set():
+                        return
+                    pieces.put(piece)
+            except Exception as e:
+                pieces.put(e)
+            finally:
+                pieces.put(done)
+
+        future = self._get_executor().submit(produce)
+        try:
+            while True:
+                try:
+                    item = pieces.get(timeout=timeout)
+                except queue.Empty:
+                    raise JobTimeoutError()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Client went away or timed out: stop the producer at its next piece
+            cancelled.set()
+            future.cancel()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -1,7 +1,29 @@
-from flask import Flask, request, jsonify
-import subprocess
+from flask import Flask, Response, request, jsonify
+from concurrent.futures import TimeoutError as JobTimeoutError
 from werkzeug.utils import secure_filename
+import json
 import os
+import sys
+import time
+import uuid
+
+# The generator scripts live in FYP/ and import each other as top-level modules
+FYP_DIR = os.environ.get('FYP_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FYP'))
+sys.path.insert(0, FYP_DIR)
+
+import analytics
+import config
+import jobs
+import metrics
+import singleflight
+import storage
+from embedding_cache import get_embedding_cache
+from embeddings import get_embedding_client
+from fingerprint import save_stream_with_hash
+from worker_pool import GenerationPool
+from yt_summerization import SummaryError, TranscriptError
+
+config.require_google_api_key()
 
 app = Flask(__name__)
 
@@ -10,6 +32,55 @@ UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)  # Ensure folder exists
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# One long-lived pool per Flask process; generators are imported once and stay warm
+pool = GenerationPool()
+job_manager = jobs.JobManager(pool)
+
+
+@app.before_request
+def start_timer():
+    request.started_at = time.perf_counter()
+
+
+@app.after_request
+def record_latency(response):
+    # Label by route pattern (not the raw path) so job ids don't create a series each
+    if config.METRICS_ENABLED and hasattr(request, 'started_at'):
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - request.started_at,
+                                     endpoint=endpoint, status=response.status_code)
+    return response
+
+
+def form_flag(name):
+    return request.form.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def remove_file(file_path):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass  # already cleaned up
+
+
+def cleanup_when_done(future, file_path):
+    """Delete the upload now, or once a job that outlived its timeout has finished with it."""
+    if future is None or future.done():
+        remove_file(file_path)
+    else:
+        future.add_done_callback(lambda _: remove_file(file_path))
+
+
+def save_job_upload():
+    """Save the uploaded PDF under a unique name, since requests and jobs share the pool and can overlap."""
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        return None
+    filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    save_stream_with_hash(file.stream, file_path)
+    return file_path
+
 @app.route('/generate_notes', methods=['POST'])
 def generate_notes_endpoint():
     if 'file' not in request.files:
@@ -23,44 +94,32 @@ def generate_notes_endpoint():
     topic = request.form.get('topic', '')
     detail_level = request.form.get('detailLevel', 'slightly detailed')
     user_id = request.form.get('userId', 'guest')
+    regenerate = form_flag('regenerate')  # bypass the generation cache
 
-    # Save the file
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
+    # Save the file under a unique name, hashing it while it streams to disk
+    file_path = save_job_upload()
 
+    if form_flag('stream'):
+        return sse_stream(pool.stream('notes', file_path, topic, detail_level, user_id, regenerate=regenerate), file_path)
+
+    future = None
     try:
-        script_path = os.path.join('F:', 'FYP', 'note_gen.py')
-        result = subprocess.run(
-            [
-                'python',
-                script_path,
-                file_path,
-                topic,
-                detail_level,
-                user_id
-            ],
-            text=True,
-            capture_output=True,
-            encoding='utf-8'
-        )
-
-        # Debugging print statements
-        print("STDOUT:", result.stdout)
-        print("STDERR:", result.stderr)
-
-        if result.returncode != 0:
-            return jsonify({"success": False, "message": result.stderr.strip()}), 500
-
-        return jsonify({"success": True, "notes": result.stdout.strip()})
+        future = pool.submit('notes', file_path, topic, detail_level, user_id, regenerate=regenerate)
+        notes = future.result(timeout=pool.timeout)
+
+        if not notes:
+            return jsonify({"success": False, "message": "No relevant content found in PDF."}), 500
 
+        return jsonify({"success": True, "notes": notes.strip()})
+
+    except JobTimeoutError:
+        return jsonify({"success": False, "message": "Note generation timed out"}), 504
     except Exception as e:
         print(f"Error: {str(e)}")  # Add debug logging
         return jsonify({"success": False, "message": str(e)}), 500
     finally:
         # Clean up the uploaded file
-        if os.path.exists(file_path):
-            os.remove(file_path)            
+        cleanup_when_done(future, file_path)
             
             
 @app.route('/generate_quiz', methods=['POST'])
@@ -77,46 +136,73 @@ def generate_quiz():
     quiz_type = request.form.get('quizType', 'true_false').lower()  # Ensure lowercase
     difficulty = request.form.get('difficulty', 'medium').lower()    # Ensure lowercase
     user_id = request.form.get('userId', 'guest')
+    regenerate = form_flag('regenerate')  # bypass the generation cache
 
-    # Save the file
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
+    # Save the file under a unique name, hashing it while it streams to disk
+    file_path = save_job_upload()
+
+    if form_flag('stream'):
+        return sse_stream(pool.stream('quiz', file_path, topic, quiz_type, difficulty, user_id, regenerate=regenerate), file_path)
 
+    future = None
     try:
-        script_path = os.path.join('F:', 'FYP', 'quiz_gen.py')
-        result = subprocess.run(
-            [
-                'python',
-                script_path,
-                file_path,
-                topic,
-                quiz_type,
-                difficulty,
-                user_id
-            ],
-            text=True,
-            capture_output=True,
-            encoding='utf-8'
-        )
-
-        # Debugging print statements
-        print("STDOUT:", result.stdout)
-        print("STDERR:", result.stderr)
-
-        if result.returncode != 0:
-            return jsonify({"success": False, "message": result.stderr.strip()}), 500
-
-        return jsonify({"success": True, "quiz": result.stdout.strip()})
+        future = pool.submit('quiz', file_path, topic, quiz_type, difficulty, user_id,
+                             regenerate=regenerate, structured=True)
+        quiz = future.result(timeout=pool.timeout)
 
+        if not quiz:
+            return jsonify({"success": False, "message": "No relevant passage found in this book."}), 500
+
+        # "quiz" keeps the text format for older clients; "questions" is the validated structured form
+        return jsonify({"success": True, **quiz, "quiz": quiz["quiz"].strip()})
+
+    except JobTimeoutError:
+        return jsonify({"success": False, "message": "Quiz generation timed out"}), 504
     except Exception as e:
         print(f"Error: {str(e)}")  # Add debug logging
         return jsonify({"success": False, "message": str(e)}), 500
     finally:
         # Clean up the uploaded file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        cleanup_when_done(future, file_path)
             
+def read_quiz_specs():
+    """The 'quizzes' form field: a JSON list of {"topic", "quizType", "difficulty"}."""
+    try:
+        specs = json.loads(request.form.get('quizzes', '[]'))
+    except ValueError:
+        return None
+    if not isinstance(specs, list) or not specs or not all(isinstance(spec, dict) for spec in specs):
+        return None
+    return specs
+
+
+@app.route('/generate_quiz_batch', methods=['POST'])
+def generate_quiz_batch():
+    specs = read_quiz_specs()
+    if specs is None:
+        return jsonify({"success": False, "message": "quizzes must be a non-empty JSON list"}), 400
+
+    file_path = save_job_upload()
+    if file_path is None:
+        return jsonify({"success": False, "message": "No file uploaded"}), 400
+
+    user_id = request.form.get('userId', 'guest')
+    future = None
+    try:
+        future = pool.submit('quiz_batch', file_path, specs, user_id, regenerate=form_flag('regenerate'))
+        quizzes = future.result(timeout=pool.timeout)
+        return jsonify({"success": True, "quizzes": quizzes})
+
+    except JobTimeoutError:
+        return jsonify({"success": False, "message": "Quiz generation timed out"}), 504
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
+    finally:
+        cleanup_when_done(future, file_path)
+
 @app.route('/summarize_video', methods=['POST'])
 def summarize_video():
     try:
@@ -126,31 +212,175 @@ def summarize_video():
         if not video_url:
             return jsonify({'success': False, 'message': 'Video URL is required'})
 
-        script_path = os.path.join('F:', 'FYP', 'yt_summerization.py')
-        result = subprocess.run(
-            [
-                'python',
-                script_path,
-                video_url
-            ],
-            text=True,
-            capture_output=True,
-            encoding='utf-8'
-        )
-
-        # Debugging print statements
-        print("STDOUT:", result.stdout)
-        print("STDERR:", result.stderr)
-
-        if result.returncode != 0:
-            return jsonify({"success": False, "message": result.stderr.strip()}), 500
+        summary = pool.run('video', video_url, length=data.get('length'))
 
-        return jsonify({"success": True, "summary": result.stdout.strip()})
+        return jsonify({"success": True, "summary": summary})
 
+    except JobTimeoutError:
+        return jsonify({"success": False, "message": "Video summarization timed out"}), 504
+    except ValueError as e:  # not a YouTube URL
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except (TranscriptError, SummaryError) as e:  # YouTube or Gemini failed upstream
+        print(f"Error: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 502
     except Exception as e:
         print(f"Error: {str(e)}")
-        return jsonify({'success': False, 'message': str(e)})
+        return jsonify({'success': False, 'message': str(e)}), 500
     
     
+# ---------------------- STREAMING ----------------------
+def sse_stream(pieces, file_path=None):
+    """Forward generated text as server-sent events: one 'data' event per piece, then 'done' or 'error'."""
+    def events():
+        try:
+            for piece in pieces:
+                yield f"data: {json.dumps({'text': piece})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except JobTimeoutError:
+            yield f"event: error\ndata: {json.dumps({'message': 'Generation timed out'})}\n\n"
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+        finally:
+            if file_path:
+                remove_file(file_path)
+
+    response = Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    if file_path:
+        # A client that disconnects before the first event never starts events(), so its finally never runs
+        response.call_on_close(lambda: remove_file(file_path))
+    return response
+
+
+# ---------------------- BACKGROUND JOBS ----------------------
+def queue_job(kind, *args, file_path=None, **kwargs):
+    on_done = (lambda: remove_file(file_path)) if file_path else None
+    try:
+        job_id = job_manager.submit(kind, *args, on_done=on_done, **kwargs)
+    except jobs.QueueFullError as e:
+        if file_path:
+            remove_file(file_path)
+        return jsonify({"success": False, "message": str(e)}), 429
+    return jsonify({"success": True, "jobId": job_id}), 202
+
+
+@app.route('/jobs/notes', methods=['POST'])
+def queue_notes_job():
+    file_path = save_job_upload()
+    if file_path is None:
+        return jsonify({"success": False, "message": "No file uploaded"}), 400
+
+    topic = request.form.get('topic', '')
+    detail_level = request.form.get('detailLevel', 'slightly detailed')
+    user_id = request.form.get('userId', 'guest')
+    return queue_job('notes', file_path, topic, detail_level, user_id,
+                     regenerate=form_flag('regenerate'), file_path=file_path)
+
+
+@app.route('/jobs/quiz', methods=['POST'])
+def queue_quiz_job():
+    file_path = save_job_upload()
+    if file_path is None:
+        return jsonify({"success": False, "message": "No file uploaded"}), 400
+
+    topic = request.form.get('topic', '')
+    quiz_type = request.form.get('quizType', 'true_false').lower()
+    difficulty = request.form.get('difficulty', 'medium').lower()
+    user_id = request.form.get('userId', 'guest')
+    return queue_job('quiz', file_path, topic, quiz_type, difficulty, user_id,
+                     regenerate=form_flag('regenerate'), structured=True, file_path=file_path)
+
+
+@app.route('/jobs/quiz_batch', methods=['POST'])
+def queue_quiz_batch_job():
+    specs = read_quiz_specs()
+    if specs is None:
+        return jsonify({"success": False, "message": "quizzes must be a non-empty JSON list"}), 400
+    file_path = save_job_upload()
+    if file_path is None:
+        return jsonify({"success": False, "message": "No file uploaded"}), 400
+
+    user_id = request.form.get('userId', 'guest')
+    return queue_job('quiz_batch', file_path, specs, user_id,
+                     regenerate=form_flag('regenerate'), file_path=file_path)
+
+
+@app.route('/jobs/video', methods=['POST'])
+def queue_video_job():
+    data = request.get_json(silent=True) or {}
+    video_url = data.get('videoUrl')
+    if not video_url:
+        return jsonify({'success': False, 'message': 'Video URL is required'}), 400
+    return queue_job('video', video_url, length=data.get('length'))
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "Unknown job"}), 404
+    return jsonify({"success": True, "job": job})
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-sent events: one message per status/stage change until the job finishes."""
+    return Response(job_manager.events(job_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# ---------------------- QUIZ ANALYTICS ----------------------
+@app.route('/analytics/attempts', methods=['POST'])
+def record_quiz_attempt():
+    record = request.get_json(silent=True) or request.form.to_dict()
+    try:
+        added = analytics.record_attempt(record)
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "message": f"Invalid attempt: {e}"}), 400
+    return jsonify({"success": True, "recorded": added})
+
+
+@app.route('/analytics/dashboard/<user_id>', methods=['GET'])
+def analytics_dashboard(user_id):
+    if user_id == analytics.ALL_USERS:
+        return jsonify({"message": "Invalid user id"}), 400
+    data = analytics.dashboard(user_id)
+    if data is None:
+        return jsonify({"message": "No quiz data found for user"}), 404
+    return jsonify(data)
+
+
+@app.route('/analytics/cohort', methods=['GET'])
+def analytics_cohort():
+    snapshot = analytics.cohort_snapshot()
+    if snapshot is None:
+        return jsonify({"message": "No cohort snapshot yet; run cohort_analytics.py"}), 404
+    table = request.args.get('table')
+    if table is None:
+        return jsonify(snapshot)
+    if table not in snapshot["tables"]:
+        return jsonify({"message": f"Unknown table: {table}"}), 400
+    return jsonify({key: snapshot[key] for key in ("version", "generated_at", "summary")}
+                   | {"table": table, "columns": snapshot["tables"][table]})
+
+
+# ---------------------- STATS ----------------------
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify({
+        "singleflight": singleflight.stats(),
+        "embedding_client": get_embedding_client().stats.snapshot(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "context": storage.context_usage_summary(),
+    })
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 if __name__ == '__main__':
+    pool.warm_up()
     app.run(port=5001, debug=True)  # Debug mode enabled
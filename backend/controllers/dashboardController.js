@@ -1,3 +1,4 @@
+const axios = require("axios");
 const Quiz = require("../models/Quiz");
 
 exports.getDashboardData = async (req, res) => {
@@ -5,6 +6,27 @@ exports.getDashboardData = async (req, res) => {
     const userId = req.params.userId; // Extract userId from URL parameters
     console.log("Received userId: ", userId);
 
+    // Pre-aggregated rollups from the Flask analytics API, used only when they
+    // cover this user's whole Mongo history (i.e. it has been backfilled with
+    // `python analytics.py --mongo`); otherwise fall back to the Mongo scan below
+    try {
+      const [response, storedQuizzes] = await Promise.all([
+        axios.get(
+          `http://localhost:5001/analytics/dashboard/${encodeURIComponent(userId)}`
+        ),
+        Quiz.countDocuments({ user_id: userId }),
+      ]);
+      const rolledUp = response.data?.totals?.quizzes || 0;
+      if (rolledUp > 0 && rolledUp === storedQuizzes) {
+        return res.json(response.data);
+      }
+      console.log(
+        `Rollups cover ${rolledUp} of ${storedQuizzes} quizzes, computing from MongoDB`
+      );
+    } catch (error) {
+      console.error("Analytics API unavailable, computing from MongoDB:", error.message);
+    }
+
     // Fetch data from MongoDB
     const quizzes = await Quiz.find({ user_id: userId });
     console.log("Quizzes fetched from MongoDB: ", quizzes);
@@ -78,6 +78,21 @@ const submitQuiz = async (req, res) => {
       wrong_attempts,
     });
     await newQuiz.save();
+
+    // Keep the Flask analytics rollups in step; the dashboard falls back to Mongo if this fails
+    axios
+      .post("http://localhost:5001/analytics/attempts", {
+        _id: newQuiz._id.toString(),
+        topic,
+        type: quizType,
+        difficulty,
+        user_id: userId,
+        correct_attempts,
+        wrong_attempts,
+        created_at: newQuiz.created_at.toISOString(),
+      })
+      .catch((err) => console.error("Error recording quiz analytics:", err.message));
+
     res
       .status(200)
       .json({ success: true, message: "Quiz results saved successfully." });
@@ -10,4 +10,7 @@ const quizSchema = new mongoose.Schema({
   created_at: { type: Date, default: Date.now },
 });
 
+// Dashboard reads (the rollup coverage count and the fallback scan) are per user
+quizSchema.index({ user_id: 1 });
+
 module.exports = mongoose.model("Quiz", quizSchema);